@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from pathlib import Path
+
+import uvicorn
+
+from ..src import api, queueing
+from ..src.config import settings
+from ..src.repository import create_task
+from ..src.schemas import RawSearchTaskMessage, SearchTaskCreateRequest
+from .loadgen import run_load
+
+BLOCKING_PATH = "/bench/blocking-search-tasks"
+ASYNC_PATH = "/api/v1/search-tasks"
+
+
+class SimulatedBrokerPool:
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+
+    def publish(self, routing_key: str, body: bytes | str, properties: object = None) -> Future:
+        return self.publish_many(routing_key, [body], properties)[0]
+
+    def publish_many(self, routing_key: str, bodies: list[bytes | str], properties: object = None) -> list[Future]:
+        futures = [Future() for _ in bodies]
+
+        def _confirm() -> None:
+            for future in futures:
+                future.set_result(None)
+
+        threading.Timer(self.latency, _confirm).start()
+        return futures
+
+    def close(self, timeout: float | None = None) -> None:
+        pass
+
+
+async def _blocking_enqueue(payload: SearchTaskCreateRequest) -> dict[str, str]:
+    task = create_task(telegram_id=payload.telegram_id, text=payload.text, priority=payload.priority)
+    message = RawSearchTaskMessage(
+        task_id=task.id,
+        telegram_id=task.telegram_id,
+        text=task.text,
+        requested_at=datetime.now(timezone.utc),
+        priority=task.priority,
+    )
+    queueing.publish_raw_task(message)
+    return {"taskId": task.id}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark POST /api/v1/search-tasks with a simulated broker")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--broker-latency-ms", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.db_path = Path(tmp) / "bench.db"
+        api.admission.max_backlog = 0
+        queueing._pool = SimulatedBrokerPool(args.broker_latency_ms / 1000)
+        api.app.add_api_route(BLOCKING_PATH, _blocking_enqueue, methods=["POST"], status_code=201)
+        server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=args.port, log_level="warning"))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.05)
+        try:
+            results = {}
+            for label, path in (("before (blocking)", BLOCKING_PATH), ("after (async)", ASYNC_PATH)):
+                results[label] = asyncio.run(run_load("127.0.0.1", args.port, path, args.concurrency, args.duration))
+        finally:
+            server.should_exit = True
+            thread.join()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import random
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+from ..src import repository
+from ..src.config import settings
+from ..src.database import close_connections, get_connection, init_db, rebuild_search_index
+from ..src.statuses import SearchTaskStatus
+
+WORDS = (
+    "новости технологий погода курс биткоина выборы футбол рецепт ужина отпуск море горы кино сериал "
+    "python sqlite rabbitmq telegram fastapi kubernetes docker postgres linux release security update "
+    "market stocks inflation startup funding ai model research paper benchmark latency cache index"
+).split()
+VOCABULARY = WORDS + [f"term{index}" for index in range(20000)]
+CUM_WEIGHTS = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(VOCABULARY))))
+QUERIES = ("новости", "sqlite index", "рецепт*", "kubernetes security update", "term4242", "zzzmissing")
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=words))
+
+
+def populate(rows: int, batch_size: int, seed: int) -> float:
+    rng = random.Random(seed)
+    started_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    started = time.perf_counter()
+    with get_connection() as conn:
+        for offset in range(0, rows, batch_size):
+            batch = []
+            for index in range(offset, min(rows, offset + batch_size)):
+                created = (started_at + timedelta(seconds=index)).isoformat()
+                batch.append(
+                    (
+                        str(uuid.UUID(int=rng.getrandbits(128))),
+                        str(index % 5000),
+                        _sentence(rng, rng.randint(2, 6)),
+                        SearchTaskStatus.DONE.value,
+                        _sentence(rng, 6),
+                        _sentence(rng, 40),
+                        created,
+                        created,
+                    )
+                )
+            conn.executemany(
+                """
+                INSERT INTO search_tasks (id, telegram_id, text, status, short_summary, summary, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                batch,
+            )
+            conn.commit()
+    return rows / (time.perf_counter() - started)
+
+
+def _like_scan(q: str, page_size: int) -> tuple[list[Any], int]:
+    clauses = []
+    params: list[str] = []
+    for word in q.split():
+        clauses.append("(text LIKE ? OR short_summary LIKE ? OR summary LIKE ?)")
+        params.extend([f"%{word.rstrip('*')}%"] * 3)
+    where_clause = " AND ".join(clauses)
+    with get_connection() as conn:
+        rows = conn.execute(
+            f"SELECT * FROM search_tasks WHERE {where_clause} ORDER BY created_at DESC LIMIT ?",
+            [*params, page_size],
+        ).fetchall()
+        total = conn.execute(f"SELECT COUNT(1) FROM search_tasks WHERE {where_clause}", params).fetchone()[0]
+    return rows, total
+
+
+def _latency_ms(repeat: int, op: Callable[[], object]) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        op()
+    return round((time.perf_counter() - started) / repeat * 1000, 2)
+
+
+def run(rows: int, batch_size: int, repeat: int, page_size: int) -> dict[str, Any]:
+    results: dict[str, Any] = {"rows": rows, "insert_rows_per_sec": round(populate(rows, batch_size, seed=7), 1)}
+    with get_connection() as conn:
+        page_bytes = conn.execute("PRAGMA page_size").fetchone()[0]
+        results["db_mib"] = round(conn.execute("PRAGMA page_count").fetchone()[0] * page_bytes / 2**20, 1)
+        started = time.perf_counter()
+        rebuild_search_index(conn)
+        results["rebuild_seconds"] = round(time.perf_counter() - started, 2)
+    for q in QUERIES:
+        _, meta = repository.search_task_rows(q, None, 1, page_size)
+        results[f"q={q}"] = {
+            "matches": meta["total_items"],
+            "fts_ms": _latency_ms(repeat, lambda: repository.search_task_rows(q, None, 1, page_size)),
+            "like_scan_ms": _latency_ms(1, lambda: _like_scan(q, page_size)),
+        }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure FTS5 indexing and ranked search against a LIKE scan")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--db-path", type=Path, default=None, help="Keep the generated database at this path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.db_path = args.db_path or Path(tmp) / "bench.db"
+        init_db()
+        try:
+            results = run(args.rows, args.batch_size, args.repeat, args.page_size)
+        finally:
+            close_connections()
+
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
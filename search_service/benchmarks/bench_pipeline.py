@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import functools
+import json
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import uvicorn
+
+from ..src import api, publisher, queueing, worker
+from ..src.config import settings
+from ..src.database import close_connections
+from ..src.relay import start_relay_thread
+from ..src.schemas import CompletedSearchTaskMessage, RawSearchTaskMessage
+from ..src.telegram import TelegramPublisher
+from .fake_telegram import FakeTelegramServer
+from .loadgen import query_payloads, run_load, summarize
+
+
+class StageRecorder:
+    def __init__(self) -> None:
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self.requested_at: dict[str, float] = {}
+        self.enqueued_at: dict[tuple[str, str], tuple[float, float]] = {}
+        self.delivered = 0
+        self.first_delivery = 0.0
+        self.last_delivery = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.samples[stage].append(max(0.0, seconds))
+
+    def delivered_task(self, task_id: str) -> None:
+        now = time.time()
+        with self._lock:
+            requested = self.requested_at.pop(task_id, None)
+            if requested is not None:
+                self.samples["end_to_end"].append(now - requested)
+            self.delivered += 1
+            self.first_delivery = self.first_delivery or now
+            self.last_delivery = now
+
+
+    def enqueued(self, queue: str, task_id: str) -> tuple[float, float]:
+        with self._lock:
+            return self.enqueued_at.pop((queue, task_id), (time.perf_counter(), time.time()))
+
+
+def _task_id(queue: str, message: Any) -> str:
+    if isinstance(message, (bytes, str)):
+        model = RawSearchTaskMessage if queue == settings.raw_queue_name else CompletedSearchTaskMessage
+        message = model.model_validate_json(message)
+    return message.task_id
+
+
+def _record_enqueue(backend: queueing.InProcessBackend, recorder: StageRecorder) -> None:
+    publish = backend.publish
+
+    def _publish(queue: str, messages: list[Any], **kwargs: Any) -> list[Future]:
+        stamp = time.perf_counter(), time.time()
+        with recorder._lock:
+            for message in messages:
+                recorder.enqueued_at[queue, _task_id(queue, message)] = stamp
+        return publish(queue, messages, **kwargs)
+
+    backend.publish = _publish
+
+
+def _handle_raw(recorder: StageRecorder, message: RawSearchTaskMessage) -> CompletedSearchTaskMessage:
+    enqueued, enqueued_wall = recorder.enqueued(settings.raw_queue_name, message.task_id)
+    recorder.record("raw_queue_wait", time.perf_counter() - enqueued)
+    requested = message.requested_at.timestamp()
+    with recorder._lock:
+        recorder.requested_at[message.task_id] = requested
+    recorder.record("outbox_relay", enqueued_wall - requested)
+    started = time.perf_counter()
+    result = worker.handle(message)
+    recorder.record("worker_handle", time.perf_counter() - started)
+    return result
+
+
+def _on_delivered(recorder: StageRecorder, task_id: str, started: float, _: Future) -> None:
+    recorder.record("telegram_delivery", time.perf_counter() - started)
+    recorder.delivered_task(task_id)
+
+
+def _handle_completed(recorder: StageRecorder, message: CompletedSearchTaskMessage) -> Future:
+    enqueued, _ = recorder.enqueued(settings.completed_queue_name, message.task_id)
+    recorder.record("completed_queue_wait", time.perf_counter() - enqueued)
+    started = time.perf_counter()
+    delivery = publisher._handle(message)
+    delivery.add_done_callback(functools.partial(_on_delivered, recorder, message.task_id, started))
+    return delivery
+
+
+def run_pipeline(args: argparse.Namespace) -> dict[str, Any]:
+    settings.broker_backend = "memory"
+    queueing.close_broker()
+    telegram = FakeTelegramServer(latency=args.telegram_latency_ms / 1000, global_limit=10**9, chat_limit=10**9)
+    telegram.start()
+    publisher.publisher = TelegramPublisher(
+        "bench-token",
+        None,
+        api_url=telegram.url,
+        pool_size=args.publisher_concurrency,
+        global_rate=10**9,
+        chat_rate=10**9,
+    )
+    recorder = StageRecorder()
+    _record_enqueue(queueing.get_backend(), recorder)
+    stop = threading.Event()
+    relay_stop = threading.Event()
+    threads = [
+        threading.Thread(
+            target=queueing.consume_raw_tasks,
+            args=(functools.partial(_handle_raw, recorder),),
+            kwargs={
+                "prefetch_count": args.worker_concurrency * 2,
+                "concurrency": args.worker_concurrency,
+                "stop_event": stop,
+            },
+            daemon=True,
+        ),
+        threading.Thread(
+            target=queueing.consume_completed_tasks,
+            args=(functools.partial(_handle_completed, recorder),),
+            kwargs={
+                "prefetch_count": args.publisher_concurrency * max(2, settings.publisher_coalesce_max_batch),
+                "concurrency": args.publisher_concurrency,
+                "stop_event": stop,
+            },
+            daemon=True,
+        ),
+    ]
+    server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=args.port, log_level="warning"))
+    server_thread = threading.Thread(target=server.run, daemon=True)
+    server_thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    start_relay_thread(relay_stop)
+    for thread in threads:
+        thread.start()
+
+    started = time.time()
+    load = asyncio.run(
+        run_load(
+            "127.0.0.1",
+            args.port,
+            "/api/v1/search-tasks",
+            args.concurrency,
+            args.duration,
+            query_payloads(args.distinct_queries),
+        )
+    )
+    drain_deadline = time.time() + args.drain_timeout
+    while recorder.delivered < load["requests"] and time.time() < drain_deadline:
+        time.sleep(0.05)
+
+    relay_stop.set()
+    stop.set()
+    publisher.coalescer.flush()
+    for thread in threads:
+        thread.join()
+    server.should_exit = True
+    server_thread.join()
+    publisher.coalescer.close()
+    telegram.shutdown()
+    publisher.publisher.close()
+    worker.status_writer.close()
+    queueing.close_broker()
+
+    elapsed = (recorder.last_delivery or time.time()) - started
+    stages = {"api_request": load["latency"]}
+    stages.update({stage: summarize(samples) for stage, samples in sorted(recorder.samples.items())})
+    return {
+        "benchmark": "pipeline",
+        "started_at": datetime.fromtimestamp(started, tz=timezone.utc).isoformat(),
+        "config": {
+            key: getattr(args, key)
+            for key in (
+                "concurrency",
+                "duration",
+                "worker_concurrency",
+                "publisher_concurrency",
+                "distinct_queries",
+                "telegram_latency_ms",
+            )
+        },
+        "throughput": {
+            "api_rps": load["rps"],
+            "api_errors": load["errors"],
+            "tasks_created": load["requests"],
+            "tasks_delivered": recorder.delivered,
+            "pipeline_tasks_per_sec": recorder.delivered / elapsed if elapsed > 0 else 0.0,
+        },
+        "stages": stages,
+        "cache": worker.search_cache.stats(),
+    }
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    regressions = []
+    current_rate = results["throughput"]["pipeline_tasks_per_sec"]
+    baseline_rate = baseline["throughput"]["pipeline_tasks_per_sec"]
+    if baseline_rate and current_rate < baseline_rate * (1 - tolerance):
+        regressions.append(f"pipeline_tasks_per_sec {baseline_rate:.1f} -> {current_rate:.1f}")
+    for stage, summary in results["stages"].items():
+        previous = baseline["stages"].get(stage, {}).get("p95_ms")
+        current = summary.get("p95_ms")
+        if previous and current and current > previous * (1 + tolerance):
+            regressions.append(f"{stage} p95 {previous:.2f}ms -> {current:.2f}ms")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="End-to-end API -> worker -> publisher benchmark with an in-memory broker")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent HTTP clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="Load duration in seconds")
+    parser.add_argument("--worker-concurrency", type=int, default=8)
+    parser.add_argument("--publisher-concurrency", type=int, default=8)
+    parser.add_argument("--distinct-queries", type=int, default=1000)
+    parser.add_argument("--telegram-latency-ms", type=float, default=5.0)
+    parser.add_argument("--drain-timeout", type=float, default=60.0)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--output", type=Path, default=None, help="Result file, defaults to bench_results/pipeline-<ts>.json")
+    parser.add_argument("--baseline", type=Path, default=None, help="Previous result file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative regression vs baseline")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.db_path = Path(tmp) / "bench.db"
+        try:
+            results = run_pipeline(args)
+        finally:
+            close_connections()
+
+    output = args.output or Path("bench_results") / f"pipeline-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+from ..src import repository
+from ..src.config import settings
+from ..src.database import close_connections, init_db
+from ..src.statuses import SearchTaskStatus
+
+
+def _measure(operations: int, op: Callable[[int], object]) -> float:
+    started = time.perf_counter()
+    for index in range(operations):
+        op(index)
+    return operations / (time.perf_counter() - started)
+
+
+def run(operations: int) -> dict[str, float]:
+    task_ids: list[str] = []
+
+    def _create(index: int) -> None:
+        task_ids.append(repository.create_task(telegram_id=str(index % 50), text=f"query {index}").id)
+
+    results = {
+        "create_task": _measure(operations, _create),
+        "get_task": _measure(operations, lambda i: repository.get_task(task_ids[i])),
+        "update_status": _measure(
+            operations, lambda i: repository.update_status(task_ids[i], SearchTaskStatus.PROCESSING)
+        ),
+        "save_result": _measure(
+            operations,
+            lambda i: repository.save_result(task_ids[i], "short", "summary", SearchTaskStatus.DONE),
+        ),
+        "reset_to_queue": _measure(operations, lambda i: repository.reset_to_queue(task_ids[i])),
+        "list_tasks": _measure(operations, lambda i: repository.list_tasks(None, page=1, page_size=20)),
+        "create_tasks[100]": _measure(
+            max(1, operations // 100),
+            lambda i: repository.create_tasks([("bench", f"batch {i} {n}", 0) for n in range(100)]),
+        )
+        * 100,
+    }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure ops/sec of repository functions")
+    parser.add_argument("--operations", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.db_path = Path(tmp) / "bench.db"
+        init_db()
+        try:
+            results = run(args.operations)
+        finally:
+            close_connections()
+
+    print(json.dumps({name: round(rate, 1) for name, rate in results.items()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from ..src import repository
+from ..src.config import settings
+from ..src.database import close_connections, init_db
+from ..src.schemas import SearchTaskPage, SearchTaskView
+from ..src.serialization import task_json, task_page_json
+from ..src.statuses import SearchTaskStatus
+
+SPEC_PATH = Path(__file__).resolve().parents[1] / "api--v1.json"
+TEXTS = ("новости технологий", 'quoted "text" \\ slash', "line\nbreak\ttab\x01", "emoji 🚀 search", "plain query")
+
+
+def _rate(operations: int, op: Callable[[], object]) -> float:
+    started = time.perf_counter()
+    for _ in range(operations):
+        op()
+    return operations / (time.perf_counter() - started)
+
+
+def _legacy_page(status: SearchTaskStatus | None, page_size: int) -> bytes:
+    tasks, meta = repository.list_tasks(status, page=1, page_size=page_size)
+    views = [
+        SearchTaskView.model_validate(
+            {
+                "task_id": task.id,
+                "telegram_id": task.telegram_id,
+                "text": task.text,
+                "status": task.status,
+                "priority": task.priority,
+                "short_summary": task.short_summary,
+                "summary": task.summary,
+                "error": task.error,
+                "created_at": task.created_at,
+                "updated_at": task.updated_at,
+            }
+        )
+        for task in tasks
+    ]
+    page = SearchTaskPage.model_validate(SearchTaskPage(data=views, meta=meta).model_dump())
+    return page.model_dump_json(by_alias=True).encode("utf-8")
+
+
+def _fast_page(status: SearchTaskStatus | None, page_size: int) -> bytes:
+    rows, meta = repository.list_task_rows(status, page=1, page_size=page_size)
+    return task_page_json(rows, meta)
+
+
+def _check_schema(value: Any, schema: dict[str, Any], components: dict[str, Any], path: str) -> None:
+    if "$ref" in schema:
+        schema = components[schema["$ref"].rsplit("/", 1)[-1]]
+    types = schema.get("type")
+    if isinstance(types, list) and value is None:
+        assert "null" in types, f"{path}: null not allowed"
+        return
+    if "enum" in schema:
+        assert value in schema["enum"], f"{path}: {value!r} not in enum"
+    if types == "object":
+        assert isinstance(value, dict), f"{path}: expected object"
+        for key in schema.get("required", ()):
+            assert key in value, f"{path}: missing {key}"
+        for key, item in value.items():
+            assert key in schema["properties"], f"{path}: unexpected {key}"
+            _check_schema(item, schema["properties"][key], components, f"{path}.{key}")
+    elif types == "array":
+        assert isinstance(value, list), f"{path}: expected array"
+        for index, item in enumerate(value):
+            _check_schema(item, schema["items"], components, f"{path}[{index}]")
+
+
+def check_contract(page_size: int) -> None:
+    components = json.loads(SPEC_PATH.read_text(encoding="utf-8"))["components"]["schemas"]
+    for status in (None, *SearchTaskStatus):
+        fast = _fast_page(status, page_size)
+        legacy = _legacy_page(status, page_size)
+        assert fast == legacy, f"page bytes differ for status={status}"
+        _check_schema(json.loads(fast), {"$ref": "#/components/schemas/SearchTaskPage"}, components, "page")
+    rows, _ = repository.list_task_rows(None, page=1, page_size=page_size)
+    for row in rows:
+        task = repository.get_task(row["id"])
+        view = SearchTaskView.model_validate_json(task_json(task))
+        assert task_json(task) == view.model_dump_json(by_alias=True), f"task bytes differ for {task.id}"
+
+
+def run(tasks: int, page_size: int, operations: int) -> dict[str, float]:
+    created = repository.create_tasks([(str(index % 50), TEXTS[index % len(TEXTS)], index % 3) for index in range(tasks)])
+    for index, task in enumerate(created):
+        if index % 3 == 0:
+            repository.save_result(task.id, "short", "summary " * 40, SearchTaskStatus.DONE)
+        elif index % 3 == 1:
+            repository.save_result(task.id, "failed", "", SearchTaskStatus.FAILED, error="boom\n")
+    check_contract(page_size)
+    return {
+        f"legacy_page[{page_size}]_per_sec": round(_rate(operations, lambda: _legacy_page(None, page_size)), 1),
+        f"fast_page[{page_size}]_per_sec": round(_rate(operations, lambda: _fast_page(None, page_size)), 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare pydantic and direct Row-to-JSON list serialization and check the output against the spec"
+    )
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--operations", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.db_path = Path(tmp) / "bench.db"
+        init_db()
+        try:
+            results = run(args.tasks, args.page_size, args.operations)
+        finally:
+            close_connections()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
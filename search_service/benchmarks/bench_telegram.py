@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from ..src.config import settings
+from ..src.database import close_connections, init_db
+from ..src.telegram import TelegramPublisher
+from .fake_telegram import FakeTelegramServer
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure Telegram delivery throughput against a fake Bot API")
+    parser.add_argument("--messages", type=int, default=300)
+    parser.add_argument("--chats", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--batch-size", type=int, default=1, help="Results merged per chat like the publisher coalescer")
+    args = parser.parse_args()
+
+    server = FakeTelegramServer(latency=args.latency_ms / 1000)
+    server.start()
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.db_path = Path(tmp) / "bench.db"
+        init_db()
+        publisher = TelegramPublisher("bench-token", None, api_url=server.url, pool_size=args.concurrency)
+        started = time.perf_counter()
+        batches: dict[str, list[tuple[str, str, str]]] = {}
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            for index in range(args.messages):
+                chat = f"chat-{index % args.chats}"
+                batch = batches.setdefault(chat, [])
+                batch.append((f"task-{index}", "short", "summary"))
+                if len(batch) >= args.batch_size:
+                    executor.submit(publisher.send_batch, chat, batches.pop(chat))
+            for chat, batch in batches.items():
+                executor.submit(publisher.send_batch, chat, batch)
+        elapsed = time.perf_counter() - started
+        publisher.close()
+        close_connections()
+    server.shutdown()
+
+    print(
+        json.dumps(
+            {
+                "results": args.messages,
+                "batch_size": args.batch_size,
+                "delivered": server.delivered,
+                "throttled": server.throttled,
+                "seconds": round(elapsed, 3),
+                "messages_per_second": round(server.delivered / elapsed, 1),
+                "results_per_second": round(args.messages / elapsed, 1),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
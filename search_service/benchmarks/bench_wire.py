@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+from pydantic import BaseModel
+
+from ..src import wire
+from ..src.ai_search import run_ai_search
+from ..src.schemas import CompletedSearchTaskMessage, RawSearchTaskMessage
+from ..src.statuses import SearchTaskStatus
+
+
+def _rate(operations: int, op: Callable[[], object]) -> float:
+    started = time.perf_counter()
+    for _ in range(operations):
+        op()
+    return operations / (time.perf_counter() - started)
+
+
+def _messages(summary_repeat: int) -> dict[str, BaseModel]:
+    now = datetime.now(timezone.utc)
+    short_summary, summary = run_ai_search("wire format benchmark")
+    return {
+        "raw": RawSearchTaskMessage(
+            task_id="2b0f6f4e-8a4e-4d1f-9c53-1c1f0f1f7c11",
+            telegram_id="123456789",
+            text="новости технологий за неделю",
+            requested_at=now,
+        ),
+        f"completed[x{summary_repeat}]": CompletedSearchTaskMessage(
+            task_id="2b0f6f4e-8a4e-4d1f-9c53-1c1f0f1f7c11",
+            telegram_id="123456789",
+            status=SearchTaskStatus.DONE,
+            short_summary=short_summary,
+            summary=" ".join([summary] * summary_repeat),
+            completed_at=now,
+        ),
+    }
+
+
+def run(operations: int, summary_repeat: int, compress_min_bytes: int) -> dict[str, dict[str, Any]]:
+    formats = {"json": ("json", 0), "msgpack": ("msgpack", 0), "msgpack+zlib": ("msgpack", compress_min_bytes)}
+    results: dict[str, dict[str, Any]] = {}
+    for name, message in _messages(summary_repeat).items():
+        model = type(message)
+        for label, (wire_format, threshold) in formats.items():
+            body, content_type, content_encoding = wire.encode(
+                message, wire_format=wire_format, compress_min_bytes=threshold
+            )
+            results[f"{name}/{label}"] = {
+                "bytes": len(body),
+                "encode_per_sec": round(
+                    _rate(operations, lambda: wire.encode(message, wire_format=wire_format, compress_min_bytes=threshold)),
+                    1,
+                ),
+                "decode_per_sec": round(
+                    _rate(operations, lambda: wire.decode(model, body, content_type, content_encoding)), 1
+                ),
+            }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare queue message encodings by size and encode/decode rate")
+    parser.add_argument("--operations", type=int, default=20000)
+    parser.add_argument("--summary-repeat", type=int, default=8, help="Repeat the AI summary to emulate long results")
+    parser.add_argument("--compress-min-bytes", type=int, default=1024)
+    args = parser.parse_args()
+    if not wire.msgpack_available():
+        parser.error("msgpack is not installed")
+    print(json.dumps(run(args.operations, args.summary_repeat, args.compress_min_bytes), indent=2))
+
+
+if __name__ == "__main__":
+    main()
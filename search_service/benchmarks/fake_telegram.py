@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+import urllib.parse
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeTelegramServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int] = ("127.0.0.1", 0),
+        *,
+        latency: float = 0.0,
+        global_limit: int = 30,
+        chat_limit: int = 1,
+        retry_after: int = 1,
+        jitter: float = 0.01,
+    ) -> None:
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.global_limit = global_limit
+        self.chat_limit = chat_limit
+        self.retry_after = retry_after
+        self.jitter = jitter
+        self.delivered = 0
+        self.throttled = 0
+        self.messages: list[dict[str, str]] = []
+        self._global_window: deque[float] = deque()
+        self._chat_windows: dict[str, deque[float]] = defaultdict(deque)
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def admit(self, chat_id: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            windows = (
+                (self._global_window, self.global_limit),
+                (self._chat_windows[chat_id], self.chat_limit),
+            )
+            for window, limit in windows:
+                while window and now - window[0] >= 1.0 - self.jitter:
+                    window.popleft()
+                if len(window) >= limit:
+                    self.throttled += 1
+                    return False
+            for window, _ in windows:
+                window.append(now)
+            self.delivered += 1
+            return True
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, name="fake-telegram", daemon=True)
+        thread.start()
+        return thread
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: FakeTelegramServer
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", "0"))
+        form = dict(urllib.parse.parse_qsl(self.rfile.read(length).decode("utf-8")))
+        if not self.path.endswith("/sendMessage") or "chat_id" not in form:
+            self._reply(400, {"ok": False, "error_code": 400, "description": "Bad Request"})
+            return
+        admitted = self.server.admit(form["chat_id"])
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if admitted:
+            with self.server._lock:
+                self.server.messages.append(form)
+            self._reply(200, {"ok": True, "result": {"chat": {"id": form["chat_id"]}, "text": form.get("text", "")}})
+        else:
+            self._reply(
+                429,
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": "Too Many Requests",
+                    "parameters": {"retry_after": self.server.retry_after},
+                },
+            )
+
+    def _reply(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a local fake Telegram Bot API")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    server = FakeTelegramServer(("127.0.0.1", args.port), latency=args.latency_ms / 1000)
+    print(f"Fake Telegram API listening on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
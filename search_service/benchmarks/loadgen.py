@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import statistics
+import time
+from typing import Any, Callable
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    if not samples:
+        return {"count": 0}
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": percentile(samples, 0.50) * 1000,
+        "p90_ms": percentile(samples, 0.90) * 1000,
+        "p95_ms": percentile(samples, 0.95) * 1000,
+        "p99_ms": percentile(samples, 0.99) * 1000,
+        "max_ms": max(samples) * 1000,
+    }
+
+
+def _request(host: str, path: str, payload: dict[str, Any]) -> bytes:
+    body = json.dumps(payload).encode()
+    return (
+        f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n"
+    ).encode() + body
+
+
+async def _client(
+    host: str,
+    port: int,
+    path: str,
+    payloads: Callable[[], dict[str, Any]],
+    deadline: float,
+    latencies: list[float],
+    counter: list[int],
+) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            writer.write(_request(host, path, payloads()))
+            await writer.drain()
+            headers = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in headers.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            if not headers.startswith((b"HTTP/1.1 200", b"HTTP/1.1 201")):
+                counter[1] += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            counter[0] += 1
+    finally:
+        writer.close()
+
+
+def query_payloads(distinct: int) -> Callable[[], dict[str, Any]]:
+    sequence = itertools.count()
+
+    def _next() -> dict[str, Any]:
+        index = next(sequence)
+        return {"telegramId": f"bench-{index % 100}", "text": f"benchmark query {index % max(1, distinct)}"}
+
+    return _next
+
+
+async def run_load(
+    host: str,
+    port: int,
+    path: str,
+    concurrency: int,
+    duration: float,
+    payloads: Callable[[], dict[str, Any]] | None = None,
+) -> dict[str, Any]:
+    payloads = payloads or query_payloads(1)
+    latencies: list[float] = []
+    counter = [0, 0]
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(_client(host, port, path, payloads, deadline, latencies, counter) for _ in range(concurrency))
+    )
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": counter[0],
+        "errors": counter[1],
+        "rps": counter[0] / elapsed if elapsed else 0.0,
+        "latency": summarize(latencies),
+    }
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Sequence
+
+from .config import settings
+from .metrics import ADMISSION_REJECTED
+from .queueing import queue_depth
+from .ratelimit import KeyedTokenBuckets, TokenBucket
+from .repository import count_finished_since, count_outbox_pending
+
+logger = logging.getLogger(__name__)
+
+STALE_AFTER_REFRESHES = 5
+
+
+@dataclass(slots=True)
+class BacklogSnapshot:
+    backlog: int
+    throughput: float
+    measured_at: float
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float) -> None:
+        super().__init__(f"Task creation rejected: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def measure_backlog(window: float) -> BacklogSnapshot:
+    backlog = queue_depth(settings.raw_queue_name) + count_outbox_pending()
+    finished = count_finished_since(datetime.now(timezone.utc) - timedelta(seconds=window))
+    return BacklogSnapshot(backlog=backlog, throughput=finished / window, measured_at=time.monotonic())
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        *,
+        max_backlog: int,
+        refresh_interval: float,
+        throughput_window: float,
+        max_retry_after: float,
+        user_rate: float,
+        user_burst: float,
+        measure: Callable[[float], BacklogSnapshot] = measure_backlog,
+    ) -> None:
+        self.max_backlog = max_backlog
+        self.refresh_interval = refresh_interval
+        self.throughput_window = throughput_window
+        self.max_retry_after = max_retry_after
+        self._measure = measure
+        self._user_buckets = KeyedTokenBuckets(user_rate, user_burst) if user_rate > 0 else None
+        self._snapshot: BacklogSnapshot | None = None
+        self._admitted = 0
+        self._failing = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if not self.max_backlog or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="admission-monitor", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.refresh_interval + 5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(self.refresh_interval)
+
+    def refresh(self) -> None:
+        try:
+            snapshot = self._measure(self.throughput_window)
+        except Exception as exc:
+            if not self._failing:
+                logger.warning("Queue depth probe failed, admitting tasks without backlog checks: %r", exc)
+            self._failing = True
+            return
+        if self._failing:
+            logger.info("Queue depth probe recovered: backlog=%d", snapshot.backlog)
+        self._failing = False
+        with self._lock:
+            self._snapshot = snapshot
+            self._admitted = 0
+
+    def snapshot(self) -> BacklogSnapshot | None:
+        with self._lock:
+            return self._snapshot
+
+    def _backlog_retry_after(self, count: int) -> float:
+        if not self.max_backlog:
+            return 0.0
+        with self._lock:
+            snapshot, admitted = self._snapshot, self._admitted
+        if snapshot is None or time.monotonic() - snapshot.measured_at > self.refresh_interval * STALE_AFTER_REFRESHES:
+            return 0.0
+        excess = snapshot.backlog + admitted + count - self.max_backlog
+        if excess <= 0:
+            return 0.0
+        if snapshot.throughput <= 0:
+            return self.max_retry_after
+        return min(self.max_retry_after, max(1.0, excess / snapshot.throughput))
+
+    def _charge_users(self, telegram_ids: Sequence[str]) -> float:
+        charged: list[tuple[TokenBucket, int]] = []
+        for telegram_id, tokens in Counter(telegram_ids).items():
+            bucket = self._user_buckets.get(telegram_id)
+            retry_after = bucket.try_acquire(tokens)
+            if retry_after:
+                for charged_bucket, charged_tokens in charged:
+                    charged_bucket.refund(charged_tokens)
+                return retry_after
+            charged.append((bucket, tokens))
+        return 0.0
+
+    def admit(self, telegram_ids: Sequence[str]) -> None:
+        count = len(telegram_ids)
+        retry_after = self._backlog_retry_after(count)
+        if retry_after:
+            self._reject("backlog", retry_after)
+        if self._user_buckets is not None:
+            retry_after = self._charge_users(telegram_ids)
+            if retry_after:
+                self._reject("user_quota", min(self.max_retry_after, retry_after))
+        with self._lock:
+            self._admitted += count
+
+    def _reject(self, reason: str, retry_after: float) -> None:
+        ADMISSION_REJECTED.inc(reason=reason)
+        raise AdmissionRejected(reason, retry_after)
+
+
+admission = AdmissionController(
+    max_backlog=settings.admission_max_backlog,
+    refresh_interval=settings.admission_refresh_interval,
+    throughput_window=settings.admission_throughput_window,
+    max_retry_after=settings.admission_max_retry_after,
+    user_rate=settings.user_task_rate,
+    user_burst=settings.user_task_burst,
+)
@@ -6,8 +6,7 @@ from datetime import datetime, timezone
 
 
 def run_ai_search(text: str) -> tuple[str, str]:
-    seed = sum(ord(ch) for ch in text)
-    random.seed(seed)
+    rng = random.Random(sum(ord(ch) for ch in text))
     sentences = [
         "We collected the latest updates from public sources.",
         "Key facts are cross-checked against multiple outlets.",
@@ -15,7 +14,7 @@ def run_ai_search(text: str) -> tuple[str, str]:
         "Trends may change quickly; monitor for updates.",
         "Review original materials if you need exact quotes.",
     ]
-    selected = random.sample(sentences, k=min(3, len(sentences)))
+    selected = rng.sample(sentences, k=min(3, len(sentences)))
     summary = " ".join(selected)
     short_summary = textwrap.shorten(summary, width=280, placeholder="...")
     return short_summary, summary
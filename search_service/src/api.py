@@ -1,97 +1,275 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
-from typing import Optional
+import asyncio
+import math
+import threading
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Iterator, Optional
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, Header, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 
-from .database import init_db
-from .queueing import publish_raw_task
+from .admission import AdmissionRejected, admission
+from .config import settings
+from .database import close_connections, init_db
+from .events import TaskEventHub
+from .metrics import CONTENT_TYPE, REGISTRY
+from .queueing import close_broker
+from .relay import start_relay_thread
 from .repository import (
+    InvalidCursorError,
+    InvalidSearchQueryError,
+    SearchTask,
+    add_task_listener,
     create_task,
+    create_tasks,
+    decode_cursor,
+    export_task_rows,
     get_task,
-    list_tasks,
+    get_task_updated_at,
+    list_task_rows,
+    search_task_rows,
+    remove_task_listener,
     reset_to_queue,
-    to_dict,
 )
 from .schemas import (
-    RawSearchTaskMessage,
+    SearchTaskBatchCreateRequest,
+    SearchTaskBatchCreateResponse,
     SearchTaskCreateRequest,
     SearchTaskCreateResponse,
     SearchTaskPage,
     SearchTaskRetryResponse,
     SearchTaskView,
 )
-from .statuses import SearchTaskStatus
+from .statuses import TERMINAL_STATUSES, SearchTaskStatus
+from .serialization import task_export_lines, task_json, task_page_json
+from .task_cache import TaskViewCache, etag_matches
 
 app = FastAPI(title="Search Service", version="1.0.0")
 
+_relay_stop = threading.Event()
+task_events = TaskEventHub(settings.task_events_poll_interval)
+
+SSE_KEEPALIVE_INTERVAL = 15.0
+EXPORT_BATCH_SIZE = 1000
+
 
 @app.on_event("startup")
 def _startup() -> None:
     init_db()
+    add_task_listener(task_events.publish)
+    add_task_listener(task_views.invalidate)
+    admission.start()
+    if settings.outbox_relay_embedded:
+        _relay_stop.clear()
+        start_relay_thread(_relay_stop)
+
+
+@app.on_event("shutdown")
+def _shutdown() -> None:
+    _relay_stop.set()
+    remove_task_listener(task_events.publish)
+    remove_task_listener(task_views.invalidate)
+    task_events.close()
+    admission.close()
+    close_broker()
+    close_connections()
+
+
+def _render_task(task: SearchTask) -> bytes:
+    return task_json(task).encode("utf-8")
+
+
+task_views = TaskViewCache(
+    get_task,
+    _render_task,
+    terminal_ttl=settings.task_cache_terminal_ttl,
+    active_ttl=settings.task_cache_active_ttl,
+    max_entries=settings.task_cache_max_entries,
+    updated_at=get_task_updated_at,
+    revalidate_after=settings.task_cache_revalidate_interval,
+)
+
+
+def _admit(telegram_ids: list[str]) -> None:
+    try:
+        admission.admit(telegram_ids)
+    except AdmissionRejected as exc:
+        raise HTTPException(
+            status_code=429,
+            detail=str(exc),
+            headers={"Retry-After": str(math.ceil(exc.retry_after))},
+        ) from exc
 
 
 @app.post("/api/v1/search-tasks", response_model=SearchTaskCreateResponse, status_code=201)
 async def enqueue_search_task(payload: SearchTaskCreateRequest) -> SearchTaskCreateResponse:
-    task = create_task(telegram_id=payload.telegram_id, text=payload.text)
-    message = RawSearchTaskMessage(
-        task_id=task.id,
-        telegram_id=task.telegram_id,
-        text=task.text,
-        requested_at=datetime.now(timezone.utc),
+    _admit([payload.telegram_id])
+    task = await run_in_threadpool(
+        create_task, telegram_id=payload.telegram_id, text=payload.text, priority=payload.priority
     )
-    publish_raw_task(message)
     return SearchTaskCreateResponse(task_id=task.id, status=task.status, queued_at=task.created_at)
 
 
+@app.post("/api/v1/search-tasks:batch", response_model=SearchTaskBatchCreateResponse, status_code=201)
+async def enqueue_search_tasks_batch(payload: SearchTaskBatchCreateRequest) -> SearchTaskBatchCreateResponse:
+    _admit([item.telegram_id for item in payload.items])
+    tasks = await run_in_threadpool(
+        create_tasks, [(item.telegram_id, item.text, item.priority) for item in payload.items]
+    )
+    return SearchTaskBatchCreateResponse(
+        items=[SearchTaskCreateResponse(task_id=task.id, status=task.status, queued_at=task.created_at) for task in tasks]
+    )
+
+
+def _task_page(
+    status: SearchTaskStatus | None,
+    page: int,
+    page_size: int,
+    cursor: str | None,
+    q: str | None,
+) -> bytes:
+    if q is not None:
+        rows, meta = search_task_rows(q, status, page, page_size)
+        return task_page_json(rows, meta, snippets=True)
+    rows, meta = list_task_rows(status, page, page_size, cursor)
+    return task_page_json(rows, meta)
+
+
 @app.get("/api/v1/search-tasks", response_model=SearchTaskPage)
 async def search_tasks(
     status: Optional[SearchTaskStatus] = Query(default=None),
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=20, ge=1, le=100, alias="pageSize"),
-) -> SearchTaskPage:
-    tasks, meta = list_tasks(status=status, page=page, page_size=page_size)
-    views = [
-        SearchTaskView.model_validate(
-            {
-                "task_id": task.id,
-                "telegram_id": task.telegram_id,
-                "text": task.text,
-                "status": task.status,
-                "short_summary": task.short_summary,
-                "summary": task.summary,
-                "error": task.error,
-                "created_at": task.created_at,
-                "updated_at": task.updated_at,
-            }
-        )
-        for task in tasks
-    ]
-    return SearchTaskPage(data=views, meta=meta)
+    cursor: Optional[str] = Query(default=None),
+    q: Optional[str] = Query(default=None, min_length=1, max_length=256),
+) -> Response:
+    if q is not None and cursor:
+        raise HTTPException(status_code=400, detail="cursor cannot be combined with q")
+    try:
+        body = await run_in_threadpool(_task_page, status, page, page_size, cursor, q)
+    except (InvalidCursorError, InvalidSearchQueryError) as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return Response(content=body, media_type="application/json")
+
+
+def _accepts_gzip(accept_encoding: str | None) -> bool:
+    return any(part.split(";", 1)[0].strip().lower() == "gzip" for part in (accept_encoding or "").split(","))
+
+
+def _gzip_stream(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+@app.get("/api/v1/search-tasks/export", response_class=StreamingResponse)
+async def export_search_tasks(
+    status: Optional[SearchTaskStatus] = Query(default=None),
+    created_from: Optional[datetime] = Query(default=None, alias="createdFrom"),
+    created_to: Optional[datetime] = Query(default=None, alias="createdTo"),
+    cursor: Optional[str] = Query(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+) -> StreamingResponse:
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except InvalidCursorError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+    chunks = (
+        task_export_lines(rows)
+        for rows in export_task_rows(status, created_from, created_to, cursor, EXPORT_BATCH_SIZE)
+    )
+    headers = {"Cache-Control": "no-store", "Vary": "Accept-Encoding"}
+    if _accepts_gzip(accept_encoding):
+        headers["Content-Encoding"] = "gzip"
+        chunks = _gzip_stream(chunks)
+    return StreamingResponse(chunks, media_type="application/x-ndjson", headers=headers)
 
 
 @app.get("/api/v1/search-tasks/{task_id}", response_model=SearchTaskView)
-async def get_search_task(task_id: str) -> SearchTaskView:
-    task = get_task(task_id)
-    if not task:
+async def get_search_task(
+    task_id: str,
+    if_none_match: Optional[str] = Header(default=None),
+) -> Response:
+    cached = task_views.peek(task_id) or await run_in_threadpool(task_views.get, task_id)
+    if cached is None:
         raise HTTPException(status_code=404, detail="Task not found")
-    return SearchTaskView.model_validate(to_dict(task))
+    headers = {"ETag": cached.etag, "Last-Modified": cached.last_modified, "Cache-Control": "no-cache"}
+    if if_none_match and etag_matches(if_none_match, cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+@app.get("/api/v1/search-tasks/{task_id}/wait", response_model=SearchTaskView)
+async def wait_search_task(
+    task_id: str,
+    timeout: float = Query(default=30, ge=0, le=settings.task_wait_max_timeout),
+) -> Response:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    with task_events.subscribe(task_id) as subscription:
+        task = await run_in_threadpool(get_task, task_id)
+        if not task:
+            raise HTTPException(status_code=404, detail="Task not found")
+        subscription.seed(task)
+        while task.status not in TERMINAL_STATUSES:
+            update = await subscription.next(deadline - loop.time())
+            if update is None:
+                break
+            task = update
+    return Response(content=_render_task(task), media_type="application/json")
+
+
+def _sse_event(task: SearchTask) -> str:
+    return f"id: {task.updated_at.isoformat()}\nevent: status\ndata: {task_json(task)}\n\n"
+
+
+@app.get("/api/v1/search-tasks/{task_id}/events", response_class=StreamingResponse)
+async def stream_search_task_events(task_id: str) -> StreamingResponse:
+    subscription = task_events.subscribe(task_id)
+    try:
+        task = await run_in_threadpool(get_task, task_id)
+        if not task:
+            raise HTTPException(status_code=404, detail="Task not found")
+        subscription.seed(task)
+    except BaseException:
+        subscription.close()
+        raise
+
+    async def _stream(task: SearchTask) -> AsyncIterator[str]:
+        with subscription:
+            yield _sse_event(task)
+            while task.status not in TERMINAL_STATUSES:
+                update = await subscription.next(SSE_KEEPALIVE_INTERVAL)
+                if update is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                task = update
+                yield _sse_event(task)
+
+    return StreamingResponse(
+        _stream(task),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.post("/api/v1/search-tasks/{task_id}/retry", response_model=SearchTaskRetryResponse, status_code=202)
 async def retry_task(task_id: str) -> SearchTaskRetryResponse:
-    task = get_task(task_id)
+    task = await run_in_threadpool(get_task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     if task.status not in {SearchTaskStatus.FAILED, SearchTaskStatus.DONE}:
         raise HTTPException(status_code=409, detail="Task is still in progress")
-    task = reset_to_queue(task_id)
-    message = RawSearchTaskMessage(
-        task_id=task_id,
-        telegram_id=task.telegram_id,
-        text=task.text,
-        requested_at=datetime.now(timezone.utc),
-    )
-    publish_raw_task(message)
+    _admit([task.telegram_id])
+    task = await run_in_threadpool(reset_to_queue, task_id)
     return SearchTaskRetryResponse(task_id=task_id, status=task.status)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -1,21 +1,80 @@
 from __future__ import annotations
 
+import os
 import sqlite3
+import threading
+import weakref
 from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
 from typing import Iterator
 
 from .config import settings
 
+_local = threading.local()
+_open_connections: weakref.WeakSet[_ThreadConnection] = weakref.WeakSet()
+_open_connections_lock = threading.Lock()
+_generation = 0
+
+
+def archive_db_path() -> Path:
+    return settings.archive_db_path or settings.db_path.with_name(f"{settings.db_path.stem}.archive.db")
+
 
 def _connect() -> sqlite3.Connection:
-    conn = sqlite3.connect(settings.db_path)
+    conn = sqlite3.connect(settings.db_path, timeout=settings.db_busy_timeout_ms / 1000, check_same_thread=False)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute(f"PRAGMA synchronous={settings.db_synchronous};")
+    conn.execute(f"PRAGMA cache_size=-{settings.db_cache_size_kib};")
+    conn.execute(f"PRAGMA mmap_size={settings.db_mmap_size};")
+    conn.execute(f"PRAGMA busy_timeout={settings.db_busy_timeout_ms};")
+    conn.execute("PRAGMA temp_store=MEMORY;")
+    conn.execute("ATTACH DATABASE ? AS archive", (str(archive_db_path()),))
+    conn.execute("PRAGMA archive.journal_mode=WAL;")
     return conn
 
 
+@dataclass(slots=True, eq=False, weakref_slot=True)
+class _ThreadConnection:
+    conn: sqlite3.Connection
+    key: tuple[int, int, str]
+
+
+def _close(conn: sqlite3.Connection) -> None:
+    try:
+        conn.close()
+    except sqlite3.ProgrammingError:
+        pass
+
+
+def _thread_connection() -> sqlite3.Connection:
+    key = (os.getpid(), _generation, str(settings.db_path))
+    current = getattr(_local, "current", None)
+    if current is None or current.key != key:
+        if current is not None:
+            _close(current.conn)
+        current = _ThreadConnection(_connect(), key)
+        weakref.finalize(current, _close, current.conn)
+        _local.current = current
+        with _open_connections_lock:
+            _open_connections.add(current)
+    return current.conn
+
+
 @contextmanager
 def get_connection() -> Iterator[sqlite3.Connection]:
+    conn = _thread_connection()
+    try:
+        yield conn
+    except BaseException:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+
+
+@contextmanager
+def dedicated_connection() -> Iterator[sqlite3.Connection]:
     conn = _connect()
     try:
         yield conn
@@ -23,6 +82,41 @@ def get_connection() -> Iterator[sqlite3.Connection]:
         conn.close()
 
 
+def close_connections() -> None:
+    global _generation
+    with _open_connections_lock:
+        _generation += 1
+        connections = [current.conn for current in _open_connections]
+        _open_connections.clear()
+    for conn in connections:
+        _close(conn)
+
+
+def rebuild_search_index(conn: sqlite3.Connection) -> None:
+    conn.execute("INSERT INTO search_tasks_fts (search_tasks_fts) VALUES ('rebuild')")
+    conn.commit()
+
+
+def optimize_search_index(conn: sqlite3.Connection) -> None:
+    conn.execute("INSERT INTO search_tasks_fts (search_tasks_fts) VALUES ('optimize')")
+    conn.commit()
+
+
+def checkpoint(vacuum: bool = False) -> None:
+    with get_connection() as conn:
+        if vacuum:
+            conn.execute("VACUUM main")
+            rebuild_search_index(conn)
+        conn.execute("PRAGMA main.wal_checkpoint(TRUNCATE)")
+        conn.execute("PRAGMA archive.wal_checkpoint(TRUNCATE)")
+
+
+def _add_missing_column(conn: sqlite3.Connection, table: str, column: str, definition: str) -> None:
+    columns = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
 def init_db() -> None:
     with get_connection() as conn:
         conn.execute(
@@ -36,21 +130,167 @@ def init_db() -> None:
                 summary TEXT,
                 error TEXT,
                 created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL
+                updated_at TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 0
             )
             """
         )
+        _add_missing_column(conn, "search_tasks", "priority", "INTEGER NOT NULL DEFAULT 0")
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS completed_messages (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 task_id TEXT NOT NULL,
                 telegram_id TEXT NOT NULL,
-                short_summary TEXT NOT NULL,
-                summary TEXT NOT NULL,
                 delivered_at TEXT,
                 FOREIGN KEY(task_id) REFERENCES search_tasks(id)
             )
             """
         )
+        completed_columns = {row["name"] for row in conn.execute("PRAGMA table_info(completed_messages)")}
+        for column in ("short_summary", "summary"):
+            if column in completed_columns:
+                conn.execute(f"ALTER TABLE completed_messages DROP COLUMN {column}")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_completed_messages_task ON completed_messages (task_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_completed_messages_delivered ON completed_messages (delivered_at)")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS archive.search_tasks_archive (
+                id TEXT PRIMARY KEY,
+                telegram_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                archived_at TEXT NOT NULL,
+                payload BLOB NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                queue TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                sent_at TEXT,
+                priority INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        _add_missing_column(conn, "outbox", "priority", "INTEGER NOT NULL DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_unsent ON outbox (id) WHERE sent_at IS NULL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ai_search_cache (
+                key TEXT PRIMARY KEY,
+                short_summary TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_ai_search_cache_expires ON ai_search_cache (expires_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_search_tasks_created ON search_tasks (created_at DESC, id DESC)")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_search_tasks_status_created ON search_tasks (status, created_at DESC, id DESC)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_search_tasks_updated ON search_tasks (updated_at)")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS search_task_counts (
+                status TEXT PRIMARY KEY,
+                total INTEGER NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            INSERT INTO search_task_counts (status, total)
+            SELECT status, COUNT(1) FROM search_tasks
+            WHERE NOT EXISTS (SELECT 1 FROM search_task_counts)
+            GROUP BY status
+            """
+        )
+        conn.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS search_tasks_count_insert AFTER INSERT ON search_tasks
+            BEGIN
+                INSERT INTO search_task_counts (status, total) VALUES (NEW.status, 1)
+                ON CONFLICT(status) DO UPDATE SET total = total + 1;
+            END
+            """
+        )
+        conn.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS search_tasks_count_update AFTER UPDATE OF status ON search_tasks
+            WHEN OLD.status <> NEW.status
+            BEGIN
+                UPDATE search_task_counts SET total = total - 1 WHERE status = OLD.status;
+                INSERT INTO search_task_counts (status, total) VALUES (NEW.status, 1)
+                ON CONFLICT(status) DO UPDATE SET total = total + 1;
+            END
+            """
+        )
+        conn.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS search_tasks_count_delete AFTER DELETE ON search_tasks
+            BEGIN
+                UPDATE search_task_counts SET total = total - 1 WHERE status = OLD.status;
+            END
+            """
+        )
+        _create_search_index(conn)
         conn.commit()
+
+
+def _create_search_index(conn: sqlite3.Connection) -> None:
+    created = not conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_tasks_fts'"
+    ).fetchone()
+    conn.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS search_tasks_fts USING fts5 (
+            text,
+            short_summary,
+            summary,
+            content = 'search_tasks',
+            content_rowid = 'rowid',
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS search_tasks_fts_insert AFTER INSERT ON search_tasks
+        BEGIN
+            INSERT INTO search_tasks_fts (rowid, text, short_summary, summary)
+            VALUES (NEW.rowid, NEW.text, NEW.short_summary, NEW.summary);
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS search_tasks_fts_delete AFTER DELETE ON search_tasks
+        BEGIN
+            INSERT INTO search_tasks_fts (search_tasks_fts, rowid, text, short_summary, summary)
+            VALUES ('delete', OLD.rowid, OLD.text, OLD.short_summary, OLD.summary);
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS search_tasks_fts_update AFTER UPDATE OF text, short_summary, summary ON search_tasks
+        WHEN OLD.text IS NOT NEW.text
+            OR OLD.short_summary IS NOT NEW.short_summary
+            OR OLD.summary IS NOT NEW.summary
+        BEGIN
+            INSERT INTO search_tasks_fts (search_tasks_fts, rowid, text, short_summary, summary)
+            VALUES ('delete', OLD.rowid, OLD.text, OLD.short_summary, OLD.summary);
+            INSERT INTO search_tasks_fts (rowid, text, short_summary, summary)
+            VALUES (NEW.rowid, NEW.text, NEW.short_summary, NEW.summary);
+        END
+        """
+    )
+    if created and conn.execute("SELECT 1 FROM search_tasks LIMIT 1").fetchone():
+        rebuild_search_index(conn)
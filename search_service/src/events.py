@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+
+from fastapi.concurrency import run_in_threadpool
+
+from .repository import SearchTask, changed_since
+
+logger = logging.getLogger(__name__)
+
+CHANGE_FEED_OVERLAP = timedelta(milliseconds=250)
+
+
+class TaskSubscription:
+    def __init__(self, hub: TaskEventHub, task_id: str, loop: asyncio.AbstractEventLoop) -> None:
+        self.task_id = task_id
+        self._hub = hub
+        self._loop = loop
+        self._queue: asyncio.Queue[SearchTask] = asyncio.Queue()
+        self._last: SearchTask | None = None
+
+    def __enter__(self) -> TaskSubscription:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def seed(self, task: SearchTask) -> None:
+        if self._is_newer(task):
+            self._last = task
+
+    def push(self, task: SearchTask) -> None:
+        self._loop.call_soon_threadsafe(self._offer, task)
+
+    def _is_newer(self, task: SearchTask) -> bool:
+        last = self._last
+        if last is None or task.updated_at > last.updated_at:
+            return True
+        return task.updated_at == last.updated_at and task.status != last.status
+
+    def _offer(self, task: SearchTask) -> None:
+        if self._is_newer(task):
+            self._last = task
+            self._queue.put_nowait(task)
+
+    async def next(self, timeout: float) -> SearchTask | None:
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self._hub._unsubscribe(self)
+
+
+class TaskEventHub:
+    def __init__(self, poll_interval: float) -> None:
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._subscribers: dict[str, set[TaskSubscription]] = {}
+        self._poller: asyncio.Task | None = None
+        self._watermark: datetime | None = None
+
+    def publish(self, task: SearchTask) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(task.id, ()))
+        for subscription in subscribers:
+            subscription.push(task)
+
+    def subscribe(self, task_id: str) -> TaskSubscription:
+        loop = asyncio.get_running_loop()
+        subscription = TaskSubscription(self, task_id, loop)
+        with self._lock:
+            self._subscribers.setdefault(task_id, set()).add(subscription)
+        if self._poller is None or self._poller.done():
+            self._poller = loop.create_task(self._poll())
+        return subscription
+
+    def _unsubscribe(self, subscription: TaskSubscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.task_id)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.task_id]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            with self._lock:
+                watching = bool(self._subscribers)
+            if not watching:
+                self._watermark = None
+                continue
+            try:
+                await self._poll_once()
+            except Exception:
+                logger.exception("Task change feed poll failed")
+
+    async def _poll_once(self) -> None:
+        if self._watermark is None:
+            self._watermark = datetime.now(timezone.utc) - self.poll_interval * timedelta(seconds=1)
+        with self._lock:
+            task_ids = list(self._subscribers)
+        if not task_ids:
+            return
+        tasks = await run_in_threadpool(changed_since, task_ids, self._watermark - CHANGE_FEED_OVERLAP)
+        for task in tasks:
+            self.publish(task)
+        if tasks:
+            self._watermark = max(self._watermark, tasks[-1].updated_at)
+
+    def close(self) -> None:
+        if self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
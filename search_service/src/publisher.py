@@ -1,34 +1,208 @@
 from __future__ import annotations
 
 import logging
+import signal
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable
 
 from .config import settings
 from .database import init_db
-from .queueing import consume_completed_tasks
+from .metrics import DELIVERY_LAG, start_metrics_server
+from .queueing import close_broker, consume_completed_tasks
 from .schemas import CompletedSearchTaskMessage
-from .telegram import TelegramPublisher
+from .telegram import DeliveryError, TelegramPublisher
 
 logger = logging.getLogger(__name__)
 
 publisher = TelegramPublisher(settings.telegram_bot_token, settings.telegram_chat_id)
 
+_Pending = tuple[CompletedSearchTaskMessage, Future]
 
-def _handle(message: CompletedSearchTaskMessage) -> None:
+
+class ChatCoalescer:
+    def __init__(
+        self,
+        deliver: Callable[[str, list[CompletedSearchTaskMessage]], None],
+        *,
+        window: float,
+        max_batch: int,
+        concurrency: int,
+    ) -> None:
+        self._deliver = deliver
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self.concurrency = max(1, concurrency)
+        self._pending: dict[str, list[_Pending]] = {}
+        self._deadlines: dict[str, float] = {}
+        self._sending: set[str] = set()
+        self._flushing = False
+        self._closed = False
+        self._condition = threading.Condition()
+        self._executor: ThreadPoolExecutor | None = None
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        with self._condition:
+            if self._thread is not None:
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="telegram-send")
+            self._thread = threading.Thread(target=self._run, name="chat-coalescer", daemon=True)
+            self._thread.start()
+
+    def submit(self, message: CompletedSearchTaskMessage) -> Future:
+        future: Future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Chat coalescer is closed")
+            batch = self._pending.setdefault(message.telegram_id, [])
+            if not batch:
+                self._deadlines[message.telegram_id] = time.monotonic() + self.window
+            batch.append((message, future))
+            if len(batch) >= self.max_batch:
+                self._deadlines[message.telegram_id] = 0.0
+            self._condition.notify()
+        return future
+
+    def flush(self) -> None:
+        with self._condition:
+            self._flushing = True
+            self._condition.notify()
+
+    def close(self) -> None:
+        with self._condition:
+            self._flushing = True
+            self._closed = True
+            self._condition.notify()
+            thread, executor = self._thread, self._executor
+        if thread is not None:
+            thread.join()
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _take_due(self) -> list[tuple[str, list[_Pending]]] | None:
+        while True:
+            now = time.monotonic()
+            due = [
+                chat
+                for chat, deadline in self._deadlines.items()
+                if chat not in self._sending and (self._flushing or deadline <= now)
+            ]
+            if due:
+                break
+            if self._closed and not self._pending and not self._sending:
+                return None
+            waiting = [deadline for chat, deadline in self._deadlines.items() if chat not in self._sending]
+            self._condition.wait(max(0.0, min(waiting) - now) if waiting and not self._flushing else None)
+        batches = []
+        for chat in due:
+            pending = self._pending[chat]
+            batches.append((chat, pending[: self.max_batch]))
+            if len(pending) > self.max_batch:
+                self._pending[chat] = pending[self.max_batch :]
+                self._deadlines[chat] = 0.0
+            else:
+                del self._pending[chat]
+                del self._deadlines[chat]
+            self._sending.add(chat)
+        return batches
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                batches = self._take_due()
+            if batches is None:
+                return
+            for chat, batch in batches:
+                self._executor.submit(self._send, chat, batch)
+
+    def _send(self, chat: str, batch: list[_Pending]) -> None:
+        try:
+            self._deliver(chat, [message for message, _ in batch])
+        except DeliveryError as exc:
+            for index, (_, future) in enumerate(batch):
+                if index < exc.delivered:
+                    future.set_result(None)
+                else:
+                    future.set_exception(exc)
+        except Exception as exc:
+            logger.exception("Failed to publish %d completed tasks to %s: %s", len(batch), chat, exc)
+            for _, future in batch:
+                future.set_result(None)
+        else:
+            for _, future in batch:
+                future.set_result(None)
+        finally:
+            with self._condition:
+                self._sending.discard(chat)
+                self._condition.notify()
+
+
+def _observe_lag(messages: list[CompletedSearchTaskMessage]) -> None:
+    now = datetime.now(timezone.utc)
+    for message in messages:
+        DELIVERY_LAG.observe((now - message.completed_at).total_seconds())
+
+
+def _deliver(telegram_id: str, messages: list[CompletedSearchTaskMessage]) -> None:
     try:
-        publisher.send(
-            task_id=message.task_id,
-            telegram_id=message.telegram_id,
-            short_summary=message.short_summary,
-            summary=message.summary,
+        publisher.send_batch(
+            telegram_id,
+            [(message.task_id, message.short_summary, message.summary) for message in messages],
         )
-    except Exception as exc:
-        logger.exception("Failed to publish completed task %s: %s", message.task_id, exc)
+    except DeliveryError as exc:
+        _observe_lag(messages[: exc.delivered])
+        raise
+    _observe_lag(messages)
+
+
+coalescer = ChatCoalescer(
+    _deliver,
+    window=settings.publisher_coalesce_window,
+    max_batch=settings.publisher_coalesce_max_batch,
+    concurrency=settings.publisher_concurrency,
+)
+
+
+def _handle(message: CompletedSearchTaskMessage) -> Future:
+    coalescer.start()
+    return coalescer.submit(message)
 
 
 def main() -> None:
     logging.basicConfig(level=logging.INFO)
     init_db()
-    consume_completed_tasks(_handle)
+    if settings.metrics_port:
+        start_metrics_server(settings.metrics_port)
+    stop_event = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stop_event.set())
+    threading.Thread(
+        target=lambda: (stop_event.wait(), coalescer.flush()),
+        name="coalescer-flush",
+        daemon=True,
+    ).start()
+    concurrency = max(1, settings.publisher_concurrency)
+    prefetch = settings.publisher_prefetch or concurrency * max(2, settings.publisher_coalesce_max_batch)
+    logger.info(
+        "Publisher started with concurrency=%d prefetch=%d coalesce_window=%.3fs",
+        concurrency,
+        prefetch,
+        settings.publisher_coalesce_window,
+    )
+    try:
+        consume_completed_tasks(
+            _handle,
+            prefetch_count=prefetch,
+            concurrency=concurrency,
+            stop_event=stop_event,
+        )
+    finally:
+        coalescer.close()
+        publisher.close()
+        close_broker()
 
 
 if __name__ == "__main__":
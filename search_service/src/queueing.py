@@ -1,87 +1,705 @@
 from __future__ import annotations
 
+import asyncio
+import atexit
+import functools
+import itertools
 import logging
-from contextlib import contextmanager
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Callable
+from typing import Any, Callable, Iterable, Sequence
 
 import pika
 from pika.adapters.blocking_connection import BlockingChannel
+from pika.adapters.select_connection import IOLoop
+from pika.channel import Channel
 from pika.spec import Basic, BasicProperties
-from pydantic import ValidationError
+from pydantic import BaseModel, ValidationError
 
 from .config import settings
+from .metrics import BROKER_PUBLISH
+from .scheduling import FairScheduling, make_executor
 from .schemas import CompletedSearchTaskMessage, RawSearchTaskMessage
 from .statuses import SearchTaskStatus
+from .wire import JSON_CONTENT_TYPE, WireFormatError, decode, encode
 
 logger = logging.getLogger(__name__)
 
+_PERSISTENT = pika.BasicProperties(delivery_mode=2)
+FAIR_SPILLED_HEADER = "x-fair-spilled"
+
+
+class PublishError(RuntimeError):
+    pass
+
+
+class RetryableError(Exception):
+    def __init__(self, message: str, *, retry_after: float | None = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
 
 def _parameters() -> pika.URLParameters:
     return pika.URLParameters(settings.rabbitmq_url)
 
 
-@contextmanager
-def _connection():
-    connection = pika.BlockingConnection(_parameters())
-    try:
-        yield connection
-    finally:
-        connection.close()
+def _retry_queue_name(delay: float) -> str:
+    return f"{settings.completed_queue_name}.retry.{int(delay * 1000)}ms"
+
+
+def _parking_queue_name() -> str:
+    return f"{settings.completed_queue_name}.parked"
+
+
+def _declared_queues() -> list[tuple[str, dict[str, Any] | None]]:
+    raw_arguments = {"x-max-priority": settings.raw_queue_max_priority} if settings.raw_queue_max_priority else None
+    queues: list[tuple[str, dict[str, Any] | None]] = [
+        (settings.raw_queue_name, raw_arguments),
+        (settings.completed_queue_name, None),
+        (_parking_queue_name(), None),
+    ]
+    for delay in settings.completed_retry_delays:
+        queues.append(
+            (
+                _retry_queue_name(delay),
+                {
+                    "x-message-ttl": int(delay * 1000),
+                    "x-dead-letter-exchange": "",
+                    "x-dead-letter-routing-key": settings.completed_queue_name,
+                },
+            )
+        )
+    return queues
 
 
 def _ensure_queues(channel: BlockingChannel) -> None:
-    channel.queue_declare(queue=settings.raw_queue_name, durable=True)
-    channel.queue_declare(queue=settings.completed_queue_name, durable=True)
+    for name, arguments in _declared_queues():
+        channel.queue_declare(queue=name, durable=True, arguments=arguments)
 
 
-def publish_raw_task(message: RawSearchTaskMessage) -> None:
-    with _connection() as connection:
-        channel = connection.channel()
-        _ensure_queues(channel)
-        channel.basic_publish(
-            exchange="",
-            routing_key=settings.raw_queue_name,
-            body=message.model_dump_json(by_alias=True),
-            properties=pika.BasicProperties(delivery_mode=2),
+@dataclass(slots=True)
+class _Outgoing:
+    routing_key: str
+    body: bytes | str
+    properties: BasicProperties
+    future: Future
+    published_at: float = field(default_factory=time.perf_counter)
+
+
+class ConfirmingPublisher:
+    def __init__(self, parameters: pika.URLParameters, *, reconnect_delay: float) -> None:
+        self._parameters = parameters
+        self._reconnect_delay = reconnect_delay
+        self._ioloop = IOLoop()
+        self._lock = threading.Lock()
+        self._outbox: deque[_Outgoing] = deque()
+        self._unconfirmed: OrderedDict[int, _Outgoing] = OrderedDict()
+        self._connection: pika.SelectConnection | None = None
+        self._channel: Channel | None = None
+        self._delivery_tag = 0
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="amqp-publisher", daemon=True)
+        self._thread.start()
+
+    def publish(self, routing_key: str, body: bytes | str, properties: BasicProperties | None = None) -> Future:
+        return self.publish_many(routing_key, [body], properties)[0]
+
+    def publish_many(
+        self,
+        routing_key: str,
+        bodies: Iterable[bytes | str],
+        properties: BasicProperties | None = None,
+    ) -> list[Future]:
+        batch = [_Outgoing(routing_key, body, properties or _PERSISTENT, Future()) for body in bodies]
+        with self._lock:
+            if self._stopping:
+                raise PublishError("Publisher is closed")
+            self._outbox.extend(batch)
+        for outgoing in batch:
+            outgoing.future.add_done_callback(self._discard_cancelled)
+        self._ioloop.add_callback_threadsafe(self._flush)
+        return [outgoing.future for outgoing in batch]
+
+    def _discard_cancelled(self, future: Future) -> None:
+        if not future.cancelled():
+            return
+        with self._lock:
+            self._outbox = deque(outgoing for outgoing in self._outbox if outgoing.future is not future)
+
+    def close(self, timeout: float | None = None) -> None:
+        with self._lock:
+            if self._stopping:
+                return
+            self._stopping = True
+        self._ioloop.add_callback_threadsafe(self._maybe_finish)
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        self._connect()
+        self._ioloop.start()
+        self._ioloop.close()
+
+    def _connect(self) -> None:
+        self._connection = pika.SelectConnection(
+            self._parameters,
+            on_open_callback=self._on_connection_open,
+            on_open_error_callback=self._on_connection_error,
+            on_close_callback=self._on_connection_closed,
+            custom_ioloop=self._ioloop,
         )
 
+    def _schedule_reconnect(self) -> None:
+        self._connection = None
+        if self._stopping:
+            self._maybe_finish()
+            return
+        self._ioloop.call_later(self._reconnect_delay, self._connect)
 
-def publish_completed_task(message: CompletedSearchTaskMessage) -> None:
-    with _connection() as connection:
-        channel = connection.channel()
-        _ensure_queues(channel)
-        channel.basic_publish(
-            exchange="",
-            routing_key=settings.completed_queue_name,
-            body=message.model_dump_json(by_alias=True),
-            properties=pika.BasicProperties(delivery_mode=2),
+    def _on_connection_open(self, connection: pika.SelectConnection) -> None:
+        connection.channel(on_open_callback=self._on_channel_open)
+
+    def _on_connection_error(self, connection: pika.SelectConnection, exc: BaseException) -> None:
+        logger.warning("Publisher connection failed: %r", exc)
+        self._schedule_reconnect()
+
+    def _on_connection_closed(self, connection: pika.SelectConnection, reason: BaseException) -> None:
+        self._channel = None
+        self._requeue_unconfirmed()
+        if not self._stopping:
+            logger.warning("Publisher connection closed, reconnecting: %s", reason)
+        self._schedule_reconnect()
+
+    def _on_channel_open(self, channel: Channel) -> None:
+        channel.add_on_close_callback(self._on_channel_closed)
+        self._declare(channel, _declared_queues())
+
+    def _on_channel_closed(self, channel: Channel, reason: BaseException) -> None:
+        self._channel = None
+        if self._connection is not None and self._connection.is_open:
+            logger.warning("Publisher channel closed: %s", reason)
+            self._connection.close()
+
+    def _declare(self, channel: Channel, remaining: list[tuple[str, dict[str, Any] | None]]) -> None:
+        if not remaining:
+            channel.confirm_delivery(self._on_delivery_confirmation, callback=lambda _frame: self._on_ready(channel))
+            return
+        name, arguments = remaining[0]
+        channel.queue_declare(
+            queue=name,
+            durable=True,
+            arguments=arguments,
+            callback=lambda _frame: self._declare(channel, remaining[1:]),
         )
 
+    def _on_ready(self, channel: Channel) -> None:
+        self._channel = channel
+        self._delivery_tag = 0
+        self._flush()
 
-def consume_raw_tasks(
-    handler: Callable[[RawSearchTaskMessage], CompletedSearchTaskMessage],
+    def _flush(self) -> None:
+        channel = self._channel
+        if channel is not None:
+            with self._lock:
+                pending = list(self._outbox)
+                self._outbox.clear()
+            for outgoing in pending:
+                if not outgoing.future.running() and not outgoing.future.set_running_or_notify_cancel():
+                    continue
+                channel.basic_publish("", outgoing.routing_key, outgoing.body, outgoing.properties)
+                self._delivery_tag += 1
+                self._unconfirmed[self._delivery_tag] = outgoing
+        if self._stopping:
+            self._maybe_finish()
+
+    def _on_delivery_confirmation(self, frame: Any) -> None:
+        method = frame.method
+        if method.multiple:
+            tags = [tag for tag in self._unconfirmed if tag <= method.delivery_tag]
+        else:
+            tags = [method.delivery_tag]
+        for tag in tags:
+            outgoing = self._unconfirmed.pop(tag, None)
+            if outgoing is None or outgoing.future.done():
+                continue
+            if isinstance(method, Basic.Ack):
+                BROKER_PUBLISH.observe(time.perf_counter() - outgoing.published_at, queue=outgoing.routing_key)
+                outgoing.future.set_result(None)
+            else:
+                outgoing.future.set_exception(PublishError(f"Broker rejected message for {outgoing.routing_key}"))
+        if self._stopping:
+            self._maybe_finish()
+
+    def _requeue_unconfirmed(self) -> None:
+        with self._lock:
+            self._outbox.extendleft(reversed(self._unconfirmed.values()))
+        self._unconfirmed.clear()
+
+    def _maybe_finish(self) -> None:
+        if self._channel is not None:
+            with self._lock:
+                drained = not self._outbox
+            if not drained or self._unconfirmed:
+                return
+        if self._connection is not None and not self._connection.is_closed:
+            if not self._connection.is_closing:
+                self._connection.close()
+            return
+        with self._lock:
+            abandoned = list(self._outbox)
+            self._outbox.clear()
+        for outgoing in abandoned:
+            if not outgoing.future.done():
+                outgoing.future.set_exception(PublishError("Publisher closed before the message was confirmed"))
+        self._ioloop.stop()
+
+
+class PublisherPool:
+    def __init__(self, size: int) -> None:
+        self._publishers = [
+            ConfirmingPublisher(_parameters(), reconnect_delay=settings.reconnect_delay) for _ in range(max(1, size))
+        ]
+        self._cursor = itertools.count()
+
+    def _next(self) -> ConfirmingPublisher:
+        return self._publishers[next(self._cursor) % len(self._publishers)]
+
+    def publish(self, routing_key: str, body: bytes | str, properties: BasicProperties | None = None) -> Future:
+        return self._next().publish(routing_key, body, properties)
+
+    def publish_many(
+        self,
+        routing_key: str,
+        bodies: Iterable[bytes | str],
+        properties: BasicProperties | None = None,
+    ) -> list[Future]:
+        return self._next().publish_many(routing_key, bodies, properties)
+
+    def close(self, timeout: float | None = None) -> None:
+        for publisher in self._publishers:
+            publisher.close(timeout)
+
+
+_pool: PublisherPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_publisher() -> PublisherPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PublisherPool(settings.publisher_pool_size)
+    return _pool
+
+
+def close_publisher() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close(timeout=settings.publish_confirm_timeout)
+
+
+def _reset_publisher_after_fork() -> None:
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_publisher_after_fork)
+
+
+def wait_confirmed(futures: list[Future]) -> None:
+    try:
+        for future in futures:
+            future.result(timeout=settings.publish_confirm_timeout)
+    except TimeoutError:
+        for future in futures:
+            future.cancel()
+        raise
+
+
+def _encode(message: Any) -> tuple[bytes | str, str, str | None]:
+    if isinstance(message, BaseModel):
+        return encode(message)
+    return message, JSON_CONTENT_TYPE, None
+
+
+def _should_spill(executor: Any, fairness: FairScheduling | None, payload: Any, headers: dict[str, Any]) -> bool:
+    if fairness is None or not fairness.spill_after or headers.get(FAIR_SPILLED_HEADER):
+        return False
+    return executor.waiting(fairness.key(payload)[0]) >= fairness.spill_after
+
+
+def _consume(
+    queue: str,
+    parse: Callable[[bytes, BasicProperties], Any],
+    process: Callable[[Any, dict[str, Any]], Future | None],
     *,
-    prefetch_count: int = 1,
+    prefetch_count: int,
+    concurrency: int,
+    stop_event: threading.Event | None,
+    fairness: FairScheduling | None = None,
 ) -> None:
+    stop_event = stop_event or threading.Event()
     connection = pika.BlockingConnection(_parameters())
     channel = connection.channel()
     _ensure_queues(channel)
-    channel.basic_qos(prefetch_count=prefetch_count)
+    channel.basic_qos(prefetch_count=max(prefetch_count, concurrency))
+    executor, submit = make_executor(concurrency, fairness, f"{queue}-consumer")
+    in_flight: set[int] = set()
+
+    def _settle(delivery_tag: int, future: Future) -> None:
+        in_flight.discard(delivery_tag)
+        if future.cancelled():
+            channel.basic_nack(delivery_tag=delivery_tag, requeue=True)
+        elif future.exception() is not None:
+            logger.error("Requeueing message from %s: %s", queue, future.exception())
+            channel.basic_nack(delivery_tag=delivery_tag, requeue=True)
+        else:
+            channel.basic_ack(delivery_tag=delivery_tag)
 
     def _on_message(ch: BlockingChannel, method: Basic.Deliver, properties: BasicProperties, body: bytes) -> None:
         try:
-            payload = RawSearchTaskMessage.model_validate_json(body)
-        except ValidationError as exc:
+            payload = parse(body, properties)
+        except (ValidationError, WireFormatError) as exc:
             ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
-            logger.warning("Invalid raw payload dropped: %s", exc)
+            logger.warning("Invalid payload from %s dropped: %s", queue, exc)
             return
 
+        delivery_tag = method.delivery_tag
+        in_flight.add(delivery_tag)
+        headers = dict(properties.headers or {})
+        if _should_spill(executor, fairness, payload, headers):
+            spilled = pika.BasicProperties(
+                delivery_mode=2,
+                content_type=properties.content_type,
+                content_encoding=properties.content_encoding,
+                priority=properties.priority,
+                headers={**headers, FAIR_SPILLED_HEADER: 1},
+            )
+            future = get_publisher().publish(queue, body, spilled)
+        else:
+            future = submit(process, payload, headers)
+        future.add_done_callback(functools.partial(_on_done, delivery_tag))
+
+    def _on_done(delivery_tag: int, future: Future) -> None:
+        if not future.cancelled() and future.exception() is None and isinstance(future.result(), Future):
+            future.result().add_done_callback(functools.partial(_on_done, delivery_tag))
+            return
+        if connection.is_open:
+            connection.add_callback_threadsafe(functools.partial(_settle, delivery_tag, future))
+
+    consumer_tag = channel.basic_consume(queue=queue, on_message_callback=_on_message, auto_ack=False)
+    try:
+        while not stop_event.is_set():
+            connection.process_data_events(time_limit=1)
+        logger.info("Stopping consumer on %s, draining %d in-flight messages", queue, len(in_flight))
+        channel.basic_cancel(consumer_tag)
+        executor.shutdown(wait=False, cancel_futures=True)
+        while in_flight:
+            connection.process_data_events(time_limit=0.1)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        if connection.is_open:
+            connection.close()
+
+
+class RabbitMQBackend:
+    def __init__(self) -> None:
+        self._probe: pika.BlockingConnection | None = None
+        self._probe_channel: BlockingChannel | None = None
+        self._probe_lock = threading.Lock()
+
+    def queue_depth(self, queue: str) -> int:
+        with self._probe_lock:
+            try:
+                if self._probe is None or not self._probe.is_open:
+                    self._probe = pika.BlockingConnection(_parameters())
+                    self._probe_channel = None
+                if self._probe_channel is None or not self._probe_channel.is_open:
+                    self._probe_channel = self._probe.channel()
+                return self._probe_channel.queue_declare(queue=queue, passive=True).method.message_count
+            except Exception:
+                self._close_probe()
+                raise
+
+    def _close_probe(self) -> None:
+        probe, self._probe, self._probe_channel = self._probe, None, None
+        if probe is not None and probe.is_open:
+            try:
+                probe.close()
+            except Exception:
+                pass
+
+    def publish(
+        self,
+        queue: str,
+        messages: Sequence[Any],
+        *,
+        headers: dict[str, Any] | None = None,
+        delay: float = 0.0,
+        priority: int | None = None,
+    ) -> list[Future]:
+        routing_key = _retry_queue_name(delay) if delay > 0 else queue
+        groups: dict[tuple[str, str | None], list[tuple[int, bytes | str]]] = {}
+        for index, message in enumerate(messages):
+            body, content_type, content_encoding = _encode(message)
+            groups.setdefault((content_type, content_encoding), []).append((index, body))
+        futures: dict[int, Future] = {}
+        for (content_type, content_encoding), encoded in groups.items():
+            properties = pika.BasicProperties(
+                delivery_mode=2,
+                content_type=content_type,
+                content_encoding=content_encoding,
+                headers=headers,
+                priority=priority,
+            )
+            published = get_publisher().publish_many(routing_key, [body for _, body in encoded], properties)
+            for (index, _), future in zip(encoded, published):
+                futures[index] = future
+        return [futures[index] for index in range(len(futures))]
+
+    def consume(
+        self,
+        queue: str,
+        model: type[BaseModel],
+        process: Callable[[Any, dict[str, Any]], Future | None],
+        *,
+        prefetch_count: int,
+        concurrency: int,
+        stop_event: threading.Event | None,
+        fairness: FairScheduling | None = None,
+    ) -> None:
+        _consume(
+            queue,
+            lambda body, properties: decode(model, body, properties.content_type, properties.content_encoding),
+            process,
+            prefetch_count=prefetch_count,
+            concurrency=concurrency,
+            stop_event=stop_event,
+            fairness=fairness,
+        )
+
+    def close(self) -> None:
+        with self._probe_lock:
+            self._close_probe()
+        close_publisher()
+
+
+class InProcessBackend:
+    def __init__(self) -> None:
+        self._queues: dict[str, asyncio.PriorityQueue] = {}
+        self._sequence = itertools.count()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="inprocess-broker", daemon=True)
+        self._thread.start()
+
+    def _queue(self, name: str) -> asyncio.PriorityQueue:
+        queue = self._queues.get(name)
+        if queue is None:
+            queue = self._queues[name] = asyncio.PriorityQueue()
+        return queue
+
+    def _put(self, queue: str, items: list[tuple[int, int, Any, dict[str, Any]]]) -> None:
+        target = self._queue(queue)
+        for item in items:
+            target.put_nowait(item)
+
+    def queue_depth(self, queue: str) -> int:
+        target = self._queues.get(queue)
+        return target.qsize() if target is not None else 0
+
+    def publish(
+        self,
+        queue: str,
+        messages: Sequence[Any],
+        *,
+        headers: dict[str, Any] | None = None,
+        delay: float = 0.0,
+        priority: int | None = None,
+    ) -> list[Future]:
+        rank = -(priority or 0)
+        items = [(rank, next(self._sequence), message, dict(headers or {})) for message in messages]
+        if delay > 0:
+            self._loop.call_soon_threadsafe(self._loop.call_later, delay, self._put, queue, items)
+        else:
+            self._loop.call_soon_threadsafe(self._put, queue, items)
+        futures = []
+        for _ in items:
+            future: Future = Future()
+            future.set_result(None)
+            futures.append(future)
+        return futures
+
+    def consume(
+        self,
+        queue: str,
+        model: type[BaseModel],
+        process: Callable[[Any, dict[str, Any]], Future | None],
+        *,
+        prefetch_count: int,
+        concurrency: int,
+        stop_event: threading.Event | None,
+        fairness: FairScheduling | None = None,
+    ) -> None:
+        stop_event = stop_event or threading.Event()
+        executor, submit = make_executor(concurrency, fairness, f"{queue}-consumer")
+        try:
+            asyncio.run_coroutine_threadsafe(
+                self._dispatch(
+                    queue,
+                    model,
+                    process,
+                    max(prefetch_count, concurrency),
+                    submit,
+                    functools.partial(_should_spill, executor, fairness),
+                    stop_event,
+                ),
+                self._loop,
+            ).result()
+        finally:
+            executor.shutdown(wait=True)
+
+    async def _dispatch(
+        self,
+        queue: str,
+        model: type[BaseModel],
+        process: Callable[[Any, dict[str, Any]], Future | None],
+        prefetch_count: int,
+        submit: Callable[..., Future],
+        should_spill: Callable[[Any, dict[str, Any]], bool],
+        stop_event: threading.Event,
+    ) -> None:
+        source = self._queue(queue)
+        slots = asyncio.Semaphore(prefetch_count)
+        in_flight: set[asyncio.Task] = set()
+
+        async def _run(rank: int, message: Any, headers: dict[str, Any]) -> None:
+            try:
+                result = await asyncio.wrap_future(submit(process, message, headers))
+                if isinstance(result, Future):
+                    await asyncio.wrap_future(result)
+            except Exception as exc:
+                logger.error("Requeueing message from %s: %s", queue, exc)
+                source.put_nowait((rank, next(self._sequence), message, headers))
+            finally:
+                slots.release()
+
+        while not stop_event.is_set():
+            await slots.acquire()
+            try:
+                rank, _, message, headers = await asyncio.wait_for(source.get(), timeout=0.2)
+            except asyncio.TimeoutError:
+                slots.release()
+                continue
+            if isinstance(message, (bytes, str)):
+                try:
+                    message = model.model_validate_json(message)
+                except ValidationError as exc:
+                    slots.release()
+                    logger.warning("Invalid payload from %s dropped: %s", queue, exc)
+                    continue
+            if should_spill(message, headers):
+                source.put_nowait((rank, next(self._sequence), message, {**headers, FAIR_SPILLED_HEADER: 1}))
+                slots.release()
+                continue
+            task = asyncio.ensure_future(_run(rank, message, headers))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        logger.info("Stopping consumer on %s, draining %d in-flight messages", queue, len(in_flight))
+        if in_flight:
+            await asyncio.gather(*in_flight)
+
+    def close(self) -> None:
+        pending = sum(queue.qsize() for queue in self._queues.values())
+        if pending:
+            logger.warning("Discarding %d undelivered in-process messages", pending)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=settings.publish_confirm_timeout)
+
+
+BrokerBackend = RabbitMQBackend | InProcessBackend
+
+_BACKENDS: dict[str, Callable[[], BrokerBackend]] = {
+    "rabbitmq": RabbitMQBackend,
+    "memory": InProcessBackend,
+}
+
+_backend: BrokerBackend | None = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> BrokerBackend:
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                factory = _BACKENDS.get(settings.broker_backend)
+                if factory is None:
+                    raise ValueError(f"Unknown broker backend: {settings.broker_backend}")
+                _backend = factory()
+    return _backend
+
+
+def close_broker() -> None:
+    global _backend
+    with _backend_lock:
+        backend, _backend = _backend, None
+    if backend is not None:
+        backend.close()
+
+
+def _reset_backend_after_fork() -> None:
+    global _backend, _backend_lock
+    _backend = None
+    _backend_lock = threading.Lock()
+
+
+atexit.register(close_broker)
+os.register_at_fork(after_in_child=_reset_backend_after_fork)
+
+
+def publish_payloads(queue: str, payloads: Sequence[Any], priority: int | None = None) -> list[Future]:
+    return get_backend().publish(queue, payloads, priority=priority)
+
+
+def queue_depth(queue: str) -> int:
+    return get_backend().queue_depth(queue)
+
+
+def publish_raw_task(message: RawSearchTaskMessage) -> None:
+    wait_confirmed(get_backend().publish(settings.raw_queue_name, [message], priority=message.priority))
+
+
+def publish_completed_task(message: CompletedSearchTaskMessage) -> None:
+    wait_confirmed(get_backend().publish(settings.completed_queue_name, [message]))
+
+
+def _fair_key(message: RawSearchTaskMessage) -> tuple[str, int]:
+    return message.telegram_id, message.priority
+
+
+def consume_raw_tasks(
+    handler: Callable[[RawSearchTaskMessage], CompletedSearchTaskMessage],
+    *,
+    prefetch_count: int = 1,
+    concurrency: int = 1,
+    stop_event: threading.Event | None = None,
+    fair: bool = False,
+    user_max_in_flight: int = 0,
+) -> None:
+    def _process(payload: RawSearchTaskMessage, headers: dict[str, Any]) -> None:
         try:
             result = handler(payload)
         except Exception as exc:
             logger.exception("Exception while handling raw task %s: %s", payload.task_id, exc)
-            failure = CompletedSearchTaskMessage(
+            result = CompletedSearchTaskMessage(
                 task_id=payload.task_id,
                 telegram_id=payload.telegram_id,
                 status=SearchTaskStatus.FAILED,
@@ -89,45 +707,95 @@ def consume_raw_tasks(
                 summary=str(exc),
                 completed_at=datetime.now(timezone.utc),
             )
-            publish_completed_task(failure)
-            ch.basic_ack(delivery_tag=method.delivery_tag)
-            return
-
         publish_completed_task(result)
-        ch.basic_ack(delivery_tag=method.delivery_tag)
 
-    channel.basic_consume(queue=settings.raw_queue_name, on_message_callback=_on_message, auto_ack=False)
-    try:
-        channel.start_consuming()
-    finally:
-        connection.close()
+    fairness = FairScheduling(_fair_key, user_max_in_flight, spill_after=user_max_in_flight or concurrency)
+    get_backend().consume(
+        settings.raw_queue_name,
+        RawSearchTaskMessage,
+        _process,
+        prefetch_count=prefetch_count,
+        concurrency=concurrency,
+        stop_event=stop_event,
+        fairness=fairness if fair else None,
+    )
 
 
-def consume_completed_tasks(
-    handler: Callable[[CompletedSearchTaskMessage], None],
-    *,
-    prefetch_count: int = 1,
+def _retry_delay(attempt: int, retry_after: float | None) -> float:
+    delays = sorted(settings.completed_retry_delays)
+    delay = delays[min(attempt, len(delays)) - 1]
+    if retry_after is not None and retry_after > delay:
+        delay = next((candidate for candidate in delays if candidate >= retry_after), delays[-1])
+    return delay
+
+
+def _schedule_completed_retry(
+    payload: CompletedSearchTaskMessage,
+    headers: dict[str, Any],
+    exc: RetryableError,
 ) -> None:
-    connection = pika.BlockingConnection(_parameters())
-    channel = connection.channel()
-    _ensure_queues(channel)
-    channel.basic_qos(prefetch_count=prefetch_count)
+    headers = dict(headers)
+    attempt = int(headers.get("x-retry-count", 0)) + 1
+    headers["x-retry-count"] = attempt
+    headers["x-last-error"] = str(exc)[:255]
+    if attempt > settings.completed_max_retries or not settings.completed_retry_delays:
+        logger.error("Parking completed task %s after %d failed deliveries: %s", payload.task_id, attempt, exc)
+        futures = get_backend().publish(_parking_queue_name(), [payload], headers=headers)
+    else:
+        delay = _retry_delay(attempt, exc.retry_after)
+        logger.warning("Retrying completed task %s in %ss (attempt %d): %s", payload.task_id, delay, attempt, exc)
+        futures = get_backend().publish(settings.completed_queue_name, [payload], headers=headers, delay=delay)
+    wait_confirmed(futures)
 
-    def _on_message(ch: BlockingChannel, method: Basic.Deliver, properties: BasicProperties, body: bytes) -> None:
+
+def _settle_completed(
+    payload: CompletedSearchTaskMessage,
+    headers: dict[str, Any],
+    settled: Future,
+    delivery: Future,
+) -> None:
+    if delivery.cancelled():
+        settled.set_exception(RuntimeError(f"Delivery of completed task {payload.task_id} was cancelled"))
+        return
+    exc = delivery.exception()
+    if isinstance(exc, RetryableError):
         try:
-            payload = CompletedSearchTaskMessage.model_validate_json(body)
-        except ValidationError as exc:
-            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
-            logger.warning("Invalid completed payload dropped: %s", exc)
+            _schedule_completed_retry(payload, headers, exc)
+        except Exception as retry_exc:
+            settled.set_exception(retry_exc)
             return
+    elif exc is not None:
+        logger.error("Exception while handling completed task %s", payload.task_id, exc_info=exc)
+    settled.set_result(None)
+
+
+def consume_completed_tasks(
+    handler: Callable[[CompletedSearchTaskMessage], Future | None],
+    *,
+    prefetch_count: int = 1,
+    concurrency: int = 1,
+    stop_event: threading.Event | None = None,
+) -> None:
+    def _process(payload: CompletedSearchTaskMessage, headers: dict[str, Any]) -> Future | None:
         try:
-            handler(payload)
+            delivery = handler(payload)
+        except RetryableError as exc:
+            _schedule_completed_retry(payload, headers, exc)
+            return None
         except Exception:
             logger.exception("Exception while handling completed task %s", payload.task_id)
-        ch.basic_ack(delivery_tag=method.delivery_tag)
+            return None
+        if delivery is None:
+            return None
+        settled: Future = Future()
+        delivery.add_done_callback(functools.partial(_settle_completed, payload, headers, settled))
+        return settled
 
-    channel.basic_consume(queue=settings.completed_queue_name, on_message_callback=_on_message, auto_ack=False)
-    try:
-        channel.start_consuming()
-    finally:
-        connection.close()
+    get_backend().consume(
+        settings.completed_queue_name,
+        CompletedSearchTaskMessage,
+        _process,
+        prefetch_count=prefetch_count,
+        concurrency=concurrency,
+        stop_event=stop_event,
+    )
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Hashable
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            debt_wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(debt_wait, self._blocked_until - now)
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = self._blocked_until - now
+            if wait <= 0 and self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return max(wait, (tokens - self._tokens) / self.rate)
+
+    def refund(self, tokens: float = 1) -> None:
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + tokens)
+
+    def acquire(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def is_idle(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            return self._tokens >= self.capacity and now >= self._blocked_until
+
+
+class KeyedTokenBuckets:
+    def __init__(self, rate: float, capacity: float, *, max_keys: int = 10000) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._max_keys = max_keys
+        self._buckets: dict[Hashable, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self._max_keys:
+                    self._prune()
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.capacity)
+            return bucket
+
+    def _prune(self) -> None:
+        for key in [key for key, bucket in self._buckets.items() if bucket.is_idle()]:
+            del self._buckets[key]
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import logging
+import signal
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from pydantic import BaseModel
+
+from .config import settings
+from .database import init_db
+from .queueing import close_broker, publish_payloads, wait_confirmed
+from .repository import OutboxEntry, fetch_outbox, mark_outbox_sent, purge_outbox
+from .schemas import CompletedSearchTaskMessage, RawSearchTaskMessage
+
+logger = logging.getLogger(__name__)
+
+PURGE_INTERVAL = 60.0
+
+
+def _queue_models() -> dict[str, type[BaseModel]]:
+    return {
+        settings.raw_queue_name: RawSearchTaskMessage,
+        settings.completed_queue_name: CompletedSearchTaskMessage,
+    }
+
+
+def _outbox_message(entry: OutboxEntry, models: dict[str, type[BaseModel]]) -> Any:
+    model = models.get(entry.queue)
+    if model is None or settings.message_format == "json":
+        return entry.payload
+    return model.model_validate_json(entry.payload)
+
+
+def _settle_in_flight(in_flight: dict[int, Future]) -> None:
+    done = [entry_id for entry_id, future in in_flight.items() if future.done()]
+    sent = [
+        entry_id
+        for entry_id in done
+        if not in_flight[entry_id].cancelled() and in_flight[entry_id].exception() is None
+    ]
+    if sent:
+        mark_outbox_sent(sent)
+    for entry_id in done:
+        del in_flight[entry_id]
+
+
+def relay_once(batch_size: int, in_flight: dict[int, Future] | None = None) -> int:
+    in_flight = {} if in_flight is None else in_flight
+    _settle_in_flight(in_flight)
+    entries = [entry for entry in fetch_outbox(batch_size + len(in_flight)) if entry.id not in in_flight]
+    if not entries:
+        return 0
+    by_queue: dict[tuple[str, int], list[OutboxEntry]] = defaultdict(list)
+    for entry in entries:
+        by_queue[entry.queue, entry.priority].append(entry)
+    models = _queue_models()
+    futures = []
+    for (queue, priority), queued in by_queue.items():
+        messages = [_outbox_message(entry, models) for entry in queued]
+        published = publish_payloads(queue, messages, priority=priority or None)
+        in_flight.update((entry.id, future) for entry, future in zip(queued, published))
+        futures.extend(published)
+    wait_confirmed(futures)
+    _settle_in_flight(in_flight)
+    return len(entries)
+
+
+def run_relay(stop_event: threading.Event) -> None:
+    next_purge = 0.0
+    in_flight: dict[int, Future] = {}
+    while not stop_event.is_set():
+        try:
+            relayed = relay_once(settings.outbox_batch_size, in_flight)
+            if time.monotonic() >= next_purge:
+                purge_outbox(datetime.now(timezone.utc) - timedelta(hours=settings.outbox_retention_hours))
+                next_purge = time.monotonic() + PURGE_INTERVAL
+        except Exception:
+            logger.exception("Outbox relay iteration failed")
+            stop_event.wait(settings.reconnect_delay)
+            continue
+        if relayed:
+            logger.debug("Relayed %d outbox entries", relayed)
+        if relayed < settings.outbox_batch_size:
+            stop_event.wait(settings.outbox_poll_interval)
+
+
+def start_relay_thread(stop_event: threading.Event) -> threading.Thread:
+    thread = threading.Thread(target=run_relay, args=(stop_event,), name="outbox-relay", daemon=True)
+    thread.start()
+    return thread
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    stop_event = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stop_event.set())
+    logger.info("Outbox relay started")
+    try:
+        run_relay(stop_event)
+    finally:
+        close_broker()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,23 @@
 from __future__ import annotations
 
+import base64
+import json
+import logging
+import zlib
+from collections import defaultdict
 from dataclasses import asdict, dataclass
 from datetime import datetime, timezone
-from typing import Any, Sequence
+from typing import Any, Callable, Iterator, Sequence
 from uuid import uuid4
 
-from .database import get_connection
+from .config import settings
+from .database import dedicated_connection, get_connection
+from .metrics import SQLITE_QUERY, TASK_TRANSITIONS
+from .schemas import RawSearchTaskMessage
 from .statuses import SearchTaskStatus
 
+logger = logging.getLogger(__name__)
+
 
 @dataclass(slots=True)
 class SearchTask:
@@ -20,6 +30,7 @@ class SearchTask:
     error: str | None
     created_at: datetime
     updated_at: datetime
+    priority: int = 0
 
     @classmethod
     def from_row(cls, row: Any) -> "SearchTask":
@@ -33,21 +44,114 @@ class SearchTask:
             error=row["error"],
             created_at=datetime.fromisoformat(row["created_at"]),
             updated_at=datetime.fromisoformat(row["updated_at"]),
+            priority=row["priority"],
+        )
+
+    @classmethod
+    def from_archive_row(cls, row: Any) -> "SearchTask":
+        payload = json.loads(zlib.decompress(row["payload"]))
+        return cls(
+            id=row["id"],
+            telegram_id=row["telegram_id"],
+            text=payload["text"],
+            status=SearchTaskStatus(row["status"]),
+            short_summary=payload["short_summary"],
+            summary=payload["summary"],
+            error=payload["error"],
+            created_at=datetime.fromisoformat(row["created_at"]),
+            updated_at=datetime.fromisoformat(row["updated_at"]),
+            priority=payload.get("priority", 0),
         )
 
 
+class InvalidCursorError(ValueError):
+    pass
+
+
+class InvalidSearchQueryError(ValueError):
+    pass
+
+
+@dataclass(slots=True)
+class StatusWrite:
+    task_id: str
+    status: SearchTaskStatus
+    is_result: bool = False
+    short_summary: str | None = None
+    summary: str | None = None
+    error: str | None = None
+
+
+@dataclass(slots=True)
+class OutboxEntry:
+    id: int
+    queue: str
+    payload: str
+    priority: int = 0
+
+
+TaskListener = Callable[["SearchTask"], None]
+
+_listeners: list[TaskListener] = []
+
+
+def add_task_listener(listener: TaskListener) -> None:
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def remove_task_listener(listener: TaskListener) -> None:
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def _notify(tasks: Sequence[SearchTask | None]) -> None:
+    for listener in _listeners:
+        for task in tasks:
+            if task is None:
+                continue
+            try:
+                listener(task)
+            except Exception:
+                logger.exception("Task listener failed for %s", task.id)
+
+
 def _utcnow() -> datetime:
     return datetime.now(tz=timezone.utc)
 
 
-def create_task(telegram_id: str, text: str) -> SearchTask:
+def _raw_outbox_row(
+    task_id: str,
+    telegram_id: str,
+    text: str,
+    priority: int,
+    now: datetime,
+) -> tuple[str, str, str, int]:
+    message = RawSearchTaskMessage(
+        task_id=task_id,
+        telegram_id=telegram_id,
+        text=text,
+        requested_at=now,
+        priority=priority,
+    )
+    return settings.raw_queue_name, message.model_dump_json(by_alias=True), now.isoformat(), priority
+
+
+def _enqueue_outbox(conn: Any, rows: Sequence[tuple[str, str, str, int]]) -> None:
+    conn.executemany("INSERT INTO outbox (queue, payload, created_at, priority) VALUES (?, ?, ?, ?)", rows)
+
+
+@SQLITE_QUERY.time(operation="create_task")
+def create_task(telegram_id: str, text: str, priority: int = 0) -> SearchTask:
     task_id = str(uuid4())
     now = _utcnow()
     with get_connection() as conn:
-        conn.execute(
+        row = conn.execute(
             """
-            INSERT INTO search_tasks (id, telegram_id, text, status, short_summary, summary, error, created_at, updated_at)
-            VALUES (?, ?, ?, ?, NULL, NULL, NULL, ?, ?)
+            INSERT INTO search_tasks
+                (id, telegram_id, text, status, short_summary, summary, error, created_at, updated_at, priority)
+            VALUES (?, ?, ?, ?, NULL, NULL, NULL, ?, ?, ?)
+            RETURNING *
             """,
             (
                 task_id,
@@ -56,119 +160,544 @@ def create_task(telegram_id: str, text: str) -> SearchTask:
                 SearchTaskStatus.QUEUED.value,
                 now.isoformat(),
                 now.isoformat(),
+                priority,
             ),
-        )
+        ).fetchone()
+        _enqueue_outbox(conn, [_raw_outbox_row(task_id, telegram_id, text, priority, now)])
         conn.commit()
 
-        row = conn.execute("SELECT * FROM search_tasks WHERE id = ?", (task_id,)).fetchone()
+    TASK_TRANSITIONS.inc(status=SearchTaskStatus.QUEUED.value)
+    task = SearchTask.from_row(row)
+    _notify([task])
+    return task
 
-    return SearchTask.from_row(row)
+
+@SQLITE_QUERY.time(operation="create_tasks")
+def create_tasks(items: Sequence[tuple[str, str, int]]) -> list[SearchTask]:
+    now = _utcnow()
+    tasks = [
+        SearchTask(
+            id=str(uuid4()),
+            telegram_id=telegram_id,
+            text=text,
+            status=SearchTaskStatus.QUEUED,
+            short_summary=None,
+            summary=None,
+            error=None,
+            created_at=now,
+            updated_at=now,
+            priority=priority,
+        )
+        for telegram_id, text, priority in items
+    ]
+    with get_connection() as conn:
+        conn.executemany(
+            """
+            INSERT INTO search_tasks
+                (id, telegram_id, text, status, short_summary, summary, error, created_at, updated_at, priority)
+            VALUES (?, ?, ?, ?, NULL, NULL, NULL, ?, ?, ?)
+            """,
+            [
+                (task.id, task.telegram_id, task.text, task.status.value, now.isoformat(), now.isoformat(), task.priority)
+                for task in tasks
+            ],
+        )
+        _enqueue_outbox(
+            conn,
+            [_raw_outbox_row(task.id, task.telegram_id, task.text, task.priority, now) for task in tasks],
+        )
+        conn.commit()
+    TASK_TRANSITIONS.inc(len(tasks), status=SearchTaskStatus.QUEUED.value)
+    _notify(tasks)
+    return tasks
 
 
+@SQLITE_QUERY.time(operation="get_task")
 def get_task(task_id: str) -> SearchTask | None:
     with get_connection() as conn:
         row = conn.execute("SELECT * FROM search_tasks WHERE id = ?", (task_id,)).fetchone()
-    return SearchTask.from_row(row) if row else None
+        if row is None:
+            archived = conn.execute("SELECT * FROM archive.search_tasks_archive WHERE id = ?", (task_id,)).fetchone()
+            return SearchTask.from_archive_row(archived) if archived else None
+    return SearchTask.from_row(row)
+
+
+def get_task_updated_at(task_id: str) -> datetime | None:
+    with get_connection() as conn:
+        row = conn.execute("SELECT updated_at FROM search_tasks WHERE id = ?", (task_id,)).fetchone()
+        if row is None:
+            row = conn.execute("SELECT updated_at FROM archive.search_tasks_archive WHERE id = ?", (task_id,)).fetchone()
+    return datetime.fromisoformat(row[0]) if row else None
+
+
+def _encode_cursor(created_at: str, task_id: str) -> str:
+    raw = f"{created_at}|{task_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
 
+def encode_cursor(task: SearchTask) -> str:
+    return _encode_cursor(task.created_at.isoformat(), task.id)
 
-def list_tasks(status: SearchTaskStatus | None, page: int, page_size: int) -> tuple[list[SearchTask], dict[str, int]]:
-    offset = (page - 1) * page_size
+
+def encode_row_cursor(row: Any) -> str:
+    return _encode_cursor(row["created_at"], row["id"])
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, task_id = raw.split("|", 1)
+        datetime.fromisoformat(created_at)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise InvalidCursorError("Malformed pagination cursor") from exc
+    return created_at, task_id
+
+
+@SQLITE_QUERY.time(operation="count_tasks")
+def count_tasks(status: SearchTaskStatus | None = None) -> int:
+    with get_connection() as conn:
+        if status:
+            row = conn.execute("SELECT total FROM search_task_counts WHERE status = ?", (status.value,)).fetchone()
+        else:
+            row = conn.execute("SELECT SUM(total) FROM search_task_counts").fetchone()
+    return (row[0] or 0) if row else 0
+
+
+@SQLITE_QUERY.time(operation="list_tasks")
+def list_task_rows(
+    status: SearchTaskStatus | None,
+    page: int,
+    page_size: int,
+    cursor: str | None = None,
+) -> tuple[list[Any], dict[str, Any]]:
+    clauses: list[str] = []
     params: list[Any] = []
-    where_clause = ""
     if status:
-        where_clause = "WHERE status = ?"
+        clauses.append("status = ?")
         params.append(status.value)
+    if cursor:
+        clauses.append("(created_at, id) < (?, ?)")
+        params.extend(decode_cursor(cursor))
+    where_clause = f"WHERE {' AND '.join(clauses)}" if clauses else ""
 
     query = f"""
         SELECT * FROM search_tasks
         {where_clause}
-        ORDER BY created_at DESC
+        ORDER BY created_at DESC, id DESC
         LIMIT ? OFFSET ?
     """
-    params.extend([page_size, offset])
-
-    total_params: Sequence[Any] = ()
-    if status:
-        total_params = (status.value,)
+    params.extend([page_size + 1, 0 if cursor else (page - 1) * page_size])
 
     with get_connection() as conn:
         rows = conn.execute(query, params).fetchall()
-        total_query = "SELECT COUNT(1) FROM search_tasks"
-        if status:
-            total_query += " WHERE status = ?"
-        total = conn.execute(total_query, total_params).fetchone()[0]
 
-    tasks = [SearchTask.from_row(row) for row in rows]
+    page_rows = rows[:page_size]
+    next_cursor = encode_row_cursor(page_rows[-1]) if len(rows) > page_size else None
+    total = count_tasks(status)
     total_pages = (total + page_size - 1) // page_size if page_size else 1
-    return tasks, {"page": page, "page_size": page_size, "total_items": total, "total_pages": total_pages}
+    return page_rows, {
+        "page": page,
+        "page_size": page_size,
+        "total_items": total,
+        "total_pages": total_pages,
+        "next_cursor": next_cursor,
+    }
+
+
+SNIPPET_TOKENS = 16
+SNIPPET_OPEN = "\ue000"
+SNIPPET_CLOSE = "\ue001"
+
+
+def build_match_query(q: str) -> str:
+    terms = []
+    for word in q.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*")
+        if word:
+            terms.append('"' + word.replace('"', '""') + '"' + ("*" if prefix else ""))
+    if not terms:
+        raise InvalidSearchQueryError("Search query has no terms")
+    return " ".join(terms)
 
 
+@SQLITE_QUERY.time(operation="search_tasks")
+def search_task_rows(
+    q: str,
+    status: SearchTaskStatus | None,
+    page: int,
+    page_size: int,
+) -> tuple[list[Any], dict[str, Any]]:
+    clauses = ["search_tasks_fts MATCH ?"]
+    params: list[Any] = [build_match_query(q)]
+    join_clause = ""
+    if status:
+        clauses.append("t.status = ?")
+        params.append(status.value)
+        join_clause = "JOIN search_tasks AS t ON t.rowid = search_tasks_fts.rowid"
+    where_clause = " AND ".join(clauses)
+    query = f"""
+        SELECT t.*, snippet(search_tasks_fts, -1, ?, ?, '…', {SNIPPET_TOKENS}) AS snippet
+        FROM search_tasks_fts
+        JOIN search_tasks AS t ON t.rowid = search_tasks_fts.rowid
+        WHERE {where_clause}
+        ORDER BY search_tasks_fts.rank
+        LIMIT ? OFFSET ?
+    """
+    with get_connection() as conn:
+        rows = conn.execute(
+            query,
+            [SNIPPET_OPEN, SNIPPET_CLOSE, *params, page_size, (page - 1) * page_size],
+        ).fetchall()
+        total = conn.execute(
+            f"""
+            SELECT COUNT(1) FROM search_tasks_fts
+            {join_clause}
+            WHERE {where_clause}
+            """,
+            params,
+        ).fetchone()[0]
+    return rows, {
+        "page": page,
+        "page_size": page_size,
+        "total_items": total,
+        "total_pages": (total + page_size - 1) // page_size,
+        "next_cursor": None,
+    }
+
+
+def _utc_isoformat(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat()
+
+
+def export_task_rows(
+    status: SearchTaskStatus | None,
+    created_from: datetime | None,
+    created_to: datetime | None,
+    cursor: str | None,
+    batch_size: int,
+) -> Iterator[list[Any]]:
+    clauses: list[str] = []
+    params: list[Any] = []
+    if status:
+        clauses.append("status = ?")
+        params.append(status.value)
+    if created_from:
+        clauses.append("created_at >= ?")
+        params.append(_utc_isoformat(created_from))
+    if created_to:
+        clauses.append("created_at < ?")
+        params.append(_utc_isoformat(created_to))
+    if cursor:
+        clauses.append("(created_at, id) < (?, ?)")
+        params.extend(decode_cursor(cursor))
+    where_clause = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    with dedicated_connection() as conn:
+        rows = conn.execute(f"SELECT * FROM search_tasks {where_clause} ORDER BY created_at DESC, id DESC", params)
+        while batch := rows.fetchmany(batch_size):
+            yield batch
+
+
+def list_tasks(
+    status: SearchTaskStatus | None,
+    page: int,
+    page_size: int,
+    cursor: str | None = None,
+) -> tuple[list[SearchTask], dict[str, Any]]:
+    rows, meta = list_task_rows(status, page, page_size, cursor)
+    return [SearchTask.from_row(row) for row in rows], meta
+
+
+@SQLITE_QUERY.time(operation="update_status")
 def update_status(task_id: str, status: SearchTaskStatus) -> SearchTask | None:
     now = _utcnow()
     with get_connection() as conn:
-        conn.execute(
+        row = conn.execute(
             """
             UPDATE search_tasks
             SET status = ?, updated_at = ?
             WHERE id = ?
+            RETURNING *
             """,
             (status.value, now.isoformat(), task_id),
-        )
+        ).fetchone()
         conn.commit()
-        row = conn.execute("SELECT * FROM search_tasks WHERE id = ?", (task_id,)).fetchone()
 
-    return SearchTask.from_row(row) if row else None
+    if row:
+        TASK_TRANSITIONS.inc(status=status.value)
+    task = SearchTask.from_row(row) if row else None
+    _notify([task])
+    return task
 
 
+@SQLITE_QUERY.time(operation="save_result")
 def save_result(task_id: str, short_summary: str, summary: str, status: SearchTaskStatus, error: str | None = None) -> SearchTask | None:
     now = _utcnow()
     with get_connection() as conn:
-        conn.execute(
+        row = conn.execute(
             """
             UPDATE search_tasks
             SET short_summary = ?, summary = ?, status = ?, error = ?, updated_at = ?
             WHERE id = ?
+            RETURNING *
             """,
             (short_summary, summary, status.value, error, now.isoformat(), task_id),
-        )
+        ).fetchone()
         conn.commit()
-        row = conn.execute("SELECT * FROM search_tasks WHERE id = ?", (task_id,)).fetchone()
-    return SearchTask.from_row(row) if row else None
+    if row:
+        TASK_TRANSITIONS.inc(status=status.value)
+    task = SearchTask.from_row(row) if row else None
+    _notify([task])
+    return task
+
+
+@SQLITE_QUERY.time(operation="apply_status_writes")
+def apply_status_writes(writes: Sequence[StatusWrite]) -> list[SearchTask | None]:
+    now = _utcnow().isoformat()
+    rows = []
+    with get_connection() as conn:
+        for write in writes:
+            if write.is_result:
+                row = conn.execute(
+                    """
+                    UPDATE search_tasks
+                    SET short_summary = ?, summary = ?, status = ?, error = ?, updated_at = ?
+                    WHERE id = ?
+                    RETURNING *
+                    """,
+                    (write.short_summary, write.summary, write.status.value, write.error, now, write.task_id),
+                ).fetchone()
+            else:
+                row = conn.execute(
+                    """
+                    UPDATE search_tasks
+                    SET status = ?, updated_at = ?
+                    WHERE id = ?
+                    RETURNING *
+                    """,
+                    (write.status.value, now, write.task_id),
+                ).fetchone()
+            rows.append(row)
+        conn.commit()
+    for write, row in zip(writes, rows):
+        if row:
+            TASK_TRANSITIONS.inc(status=write.status.value)
+    tasks = [SearchTask.from_row(row) if row else None for row in rows]
+    _notify(tasks)
+    return tasks
+
 
+def _restore_archived(conn: Any, task_id: str, now: datetime) -> Any:
+    archived = conn.execute("SELECT * FROM archive.search_tasks_archive WHERE id = ?", (task_id,)).fetchone()
+    if archived is None:
+        return None
+    task = SearchTask.from_archive_row(archived)
+    row = conn.execute(
+        """
+        INSERT INTO search_tasks
+            (id, telegram_id, text, status, short_summary, summary, error, created_at, updated_at, priority)
+        VALUES (?, ?, ?, ?, NULL, NULL, NULL, ?, ?, ?)
+        RETURNING *
+        """,
+        (
+            task.id,
+            task.telegram_id,
+            task.text,
+            SearchTaskStatus.QUEUED.value,
+            archived["created_at"],
+            now.isoformat(),
+            task.priority,
+        ),
+    ).fetchone()
+    conn.execute("DELETE FROM archive.search_tasks_archive WHERE id = ?", (task_id,))
+    return row
 
+
+@SQLITE_QUERY.time(operation="reset_to_queue")
 def reset_to_queue(task_id: str) -> SearchTask | None:
     now = _utcnow()
     with get_connection() as conn:
-        conn.execute(
+        row = conn.execute(
             """
             UPDATE search_tasks
             SET status = ?, short_summary = NULL, summary = NULL, error = NULL, updated_at = ?
             WHERE id = ?
+            RETURNING *
             """,
             (SearchTaskStatus.QUEUED.value, now.isoformat(), task_id),
+        ).fetchone()
+        if row is None:
+            row = _restore_archived(conn, task_id, now)
+        if row:
+            _enqueue_outbox(conn, [_raw_outbox_row(task_id, row["telegram_id"], row["text"], row["priority"], now)])
+        conn.commit()
+    if row:
+        TASK_TRANSITIONS.inc(status=SearchTaskStatus.QUEUED.value)
+    task = SearchTask.from_row(row) if row else None
+    _notify([task])
+    return task
+
+
+CHANGED_SINCE_CHUNK = 500
+
+
+@SQLITE_QUERY.time(operation="changed_since")
+def changed_since(task_ids: Sequence[str], updated_after: datetime) -> list[SearchTask]:
+    rows: list[Any] = []
+    with get_connection() as conn:
+        for offset in range(0, len(task_ids), CHANGED_SINCE_CHUNK):
+            chunk = task_ids[offset : offset + CHANGED_SINCE_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows.extend(
+                conn.execute(
+                    f"SELECT * FROM search_tasks WHERE id IN ({placeholders}) AND updated_at > ?",
+                    (*chunk, updated_after.isoformat()),
+                ).fetchall()
+            )
+    tasks = [SearchTask.from_row(row) for row in rows]
+    tasks.sort(key=lambda task: task.updated_at)
+    return tasks
+
+
+@SQLITE_QUERY.time(operation="fetch_outbox")
+def fetch_outbox(limit: int) -> list[OutboxEntry]:
+    with get_connection() as conn:
+        rows = conn.execute(
+            "SELECT id, queue, payload, priority FROM outbox WHERE sent_at IS NULL ORDER BY id LIMIT ?",
+            (limit,),
+        ).fetchall()
+    return [
+        OutboxEntry(id=row["id"], queue=row["queue"], payload=row["payload"], priority=row["priority"])
+        for row in rows
+    ]
+
+
+@SQLITE_QUERY.time(operation="count_outbox_pending")
+def count_outbox_pending() -> int:
+    with get_connection() as conn:
+        return conn.execute("SELECT COUNT(1) FROM outbox WHERE sent_at IS NULL").fetchone()[0]
+
+
+@SQLITE_QUERY.time(operation="count_finished_since")
+def count_finished_since(updated_after: datetime) -> int:
+    with get_connection() as conn:
+        return conn.execute(
+            "SELECT COUNT(1) FROM search_tasks WHERE updated_at > ? AND status IN (?, ?)",
+            (updated_after.isoformat(), SearchTaskStatus.DONE.value, SearchTaskStatus.FAILED.value),
+        ).fetchone()[0]
+
+
+@SQLITE_QUERY.time(operation="count_delivered_since")
+def count_delivered_since(delivered_after: datetime) -> int:
+    with get_connection() as conn:
+        return conn.execute(
+            "SELECT COUNT(1) FROM completed_messages WHERE delivered_at > ?",
+            (delivered_after.isoformat(),),
+        ).fetchone()[0]
+
+
+@SQLITE_QUERY.time(operation="mark_outbox_sent")
+def mark_outbox_sent(entry_ids: Sequence[int]) -> None:
+    now = _utcnow().isoformat()
+    with get_connection() as conn:
+        conn.executemany("UPDATE outbox SET sent_at = ? WHERE id = ?", [(now, entry_id) for entry_id in entry_ids])
+        conn.commit()
+
+
+@SQLITE_QUERY.time(operation="purge_outbox")
+def purge_outbox(sent_before: datetime) -> int:
+    with get_connection() as conn:
+        deleted = conn.execute(
+            "DELETE FROM outbox WHERE sent_at IS NOT NULL AND sent_at < ?",
+            (sent_before.isoformat(),),
+        ).rowcount
+        conn.commit()
+    return deleted
+
+
+@SQLITE_QUERY.time(operation="record_completed_messages")
+def record_completed_messages(task_ids: list[str], telegram_id: str, delivered_at: datetime) -> None:
+    with get_connection() as conn:
+        conn.executemany(
+            "INSERT INTO completed_messages (task_id, telegram_id, delivered_at) VALUES (?, ?, ?)",
+            [(task_id, telegram_id, delivered_at.isoformat()) for task_id in task_ids],
         )
         conn.commit()
-        row = conn.execute("SELECT * FROM search_tasks WHERE id = ?", (task_id,)).fetchone()
-    return SearchTask.from_row(row) if row else None
 
 
-def record_completed_message(task_id: str, telegram_id: str, short_summary: str, summary: str, delivered_at: datetime | None = None) -> None:
+def _archive_payload(row: Any, deliveries: list[dict[str, Any]]) -> bytes:
+    payload = {
+        "text": row["text"],
+        "short_summary": row["short_summary"],
+        "summary": row["summary"],
+        "error": row["error"],
+        "priority": row["priority"],
+        "deliveries": deliveries,
+    }
+    return zlib.compress(json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+@SQLITE_QUERY.time(operation="archive_tasks")
+def archive_tasks(updated_before: datetime, limit: int) -> int:
+    archived_at = _utcnow().isoformat()
     with get_connection() as conn:
-        conn.execute(
+        rows = conn.execute(
             """
-            INSERT INTO completed_messages (task_id, telegram_id, short_summary, summary, delivered_at)
-            VALUES (?, ?, ?, ?, ?)
+            SELECT * FROM search_tasks
+            WHERE updated_at < ? AND status IN (?, ?)
+            ORDER BY updated_at
+            LIMIT ?
             """,
-            (
-                task_id,
-                telegram_id,
-                short_summary,
-                summary,
-                delivered_at.isoformat() if delivered_at else None,
-            ),
+            (updated_before.isoformat(), SearchTaskStatus.DONE.value, SearchTaskStatus.FAILED.value, limit),
+        ).fetchall()
+        if not rows:
+            return 0
+        task_ids = [row["id"] for row in rows]
+        placeholders = ", ".join("?" * len(task_ids))
+        deliveries: dict[str, list[dict[str, Any]]] = defaultdict(list)
+        for delivery in conn.execute(
+            f"SELECT task_id, telegram_id, delivered_at FROM completed_messages WHERE task_id IN ({placeholders})",
+            task_ids,
+        ):
+            deliveries[delivery["task_id"]].append(
+                {"telegram_id": delivery["telegram_id"], "delivered_at": delivery["delivered_at"]}
+            )
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO archive.search_tasks_archive
+                (id, telegram_id, status, created_at, updated_at, archived_at, payload)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    row["id"],
+                    row["telegram_id"],
+                    row["status"],
+                    row["created_at"],
+                    row["updated_at"],
+                    archived_at,
+                    _archive_payload(row, deliveries[row["id"]]),
+                )
+                for row in rows
+            ],
         )
         conn.commit()
 
+        conn.execute("BEGIN IMMEDIATE")
+        archived = 0
+        for row in rows:
+            deleted = conn.execute(
+                "DELETE FROM search_tasks WHERE id = ? AND updated_at = ?",
+                (row["id"], row["updated_at"]),
+            ).rowcount
+            if deleted:
+                conn.execute("DELETE FROM completed_messages WHERE task_id = ?", (row["id"],))
+                archived += deleted
+        conn.commit()
+    return archived
+
 
 def to_dict(task: SearchTask) -> dict[str, Any]:
     result = asdict(task)
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import signal
+import threading
+from datetime import datetime, timedelta, timezone
+
+from .config import settings
+from .database import checkpoint, init_db
+from .repository import archive_tasks
+
+logger = logging.getLogger(__name__)
+
+
+def archive_expired(retention_days: float, batch_size: int) -> int:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    total = 0
+    while True:
+        archived = archive_tasks(cutoff, batch_size)
+        total += archived
+        if archived < batch_size:
+            return total
+
+
+def run_retention(stop_event: threading.Event, retention_days: float, *, vacuum: bool = False) -> None:
+    while not stop_event.is_set():
+        try:
+            archived = archive_expired(retention_days, settings.retention_batch_size)
+            if archived:
+                checkpoint(vacuum)
+                logger.info("Archived %d tasks older than %s days", archived, retention_days)
+        except Exception:
+            logger.exception("Retention run failed")
+        stop_event.wait(settings.retention_interval)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Move finished search tasks into the compressed archive database")
+    parser.add_argument(
+        "--older-than-days",
+        type=float,
+        default=settings.task_retention_days,
+        help="Archive done/failed tasks not updated for this many days (TASK_RETENTION_DAYS)",
+    )
+    parser.add_argument("--once", action="store_true", help="Run a single pass and exit")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM the hot database after archiving")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    if args.once:
+        archived = archive_expired(args.older_than_days, settings.retention_batch_size)
+        checkpoint(args.vacuum)
+        logger.info("Archived %d tasks older than %s days", archived, args.older_than_days)
+        return
+    stop_event = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stop_event.set())
+    logger.info("Retention started, archiving tasks older than %s days", args.older_than_days)
+    run_retention(stop_event, args.older_than_days, vacuum=args.vacuum)
+
+
+if __name__ == "__main__":
+    main()
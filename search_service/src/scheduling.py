@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable
+
+
+class FairExecutor:
+    def __init__(self, max_workers: int, *, per_key_limit: int = 0, thread_name_prefix: str = "fair") -> None:
+        self._per_key_limit = per_key_limit
+        self._condition = threading.Condition()
+        self._queues: dict[str, list[tuple[int, int, Future, Callable[..., Any], tuple[Any, ...]]]] = {}
+        self._rotation: deque[str] = deque()
+        self._in_flight: dict[str, int] = {}
+        self._sequence = itertools.count()
+        self._shutdown = False
+        self._threads = [
+            threading.Thread(target=self._work, name=f"{thread_name_prefix}_{index}", daemon=True)
+            for index in range(max(1, max_workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, key: str, priority: int, fn: Callable[..., Any], *args: Any) -> Future:
+        future: Future = Future()
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            queue = self._queues.get(key)
+            if queue is None:
+                queue = self._queues[key] = []
+                self._rotation.append(key)
+            heapq.heappush(queue, (-priority, next(self._sequence), future, fn, args))
+            self._condition.notify()
+        return future
+
+    def pending(self) -> int:
+        with self._condition:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def waiting(self, key: str) -> int:
+        with self._condition:
+            return len(self._queues.get(key, ()))
+
+    def _next(self) -> tuple[str, Future, Callable[..., Any], tuple[Any, ...]] | None:
+        chosen = None
+        best = None
+        for index, key in enumerate(self._rotation):
+            if self._per_key_limit and self._in_flight.get(key, 0) >= self._per_key_limit:
+                continue
+            head = self._queues[key][0][0]
+            if best is None or head < best:
+                chosen, best = index, head
+        if chosen is None:
+            return None
+        key = self._rotation[chosen]
+        del self._rotation[chosen]
+        queue = self._queues[key]
+        _, _, future, fn, args = heapq.heappop(queue)
+        if queue:
+            self._rotation.append(key)
+        else:
+            del self._queues[key]
+        return key, future, fn, args
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                work = self._next()
+                while work is None:
+                    if self._shutdown and not self._queues:
+                        return
+                    self._condition.wait()
+                    work = self._next()
+                key, future, fn, args = work
+                self._in_flight[key] = self._in_flight.get(key, 0) + 1
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = fn(*args)
+                except BaseException as exc:
+                    future.set_exception(exc)
+                else:
+                    future.set_result(result)
+            with self._condition:
+                remaining = self._in_flight[key] - 1
+                if remaining:
+                    self._in_flight[key] = remaining
+                else:
+                    del self._in_flight[key]
+                self._condition.notify_all()
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        with self._condition:
+            self._shutdown = True
+            if cancel_futures:
+                for queue in self._queues.values():
+                    for _, _, future, _, _ in queue:
+                        future.cancel()
+                self._queues.clear()
+                self._rotation.clear()
+            self._condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+
+@dataclass(slots=True)
+class FairScheduling:
+    key: Callable[[Any], tuple[str, int]]
+    per_key_limit: int = 0
+    spill_after: int = 0
+
+
+def make_executor(
+    concurrency: int,
+    fairness: FairScheduling | None,
+    thread_name_prefix: str,
+) -> tuple[ThreadPoolExecutor | FairExecutor, Callable[..., Future]]:
+    if fairness is None:
+        pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=thread_name_prefix)
+        return pool, lambda fn, payload, *args: pool.submit(fn, payload, *args)
+    fair = FairExecutor(concurrency, per_key_limit=fairness.per_key_limit, thread_name_prefix=thread_name_prefix)
+    return fair, lambda fn, payload, *args: fair.submit(*fairness.key(payload), fn, payload, *args)
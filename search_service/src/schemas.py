@@ -20,6 +20,7 @@ class CamelModel(BaseModel):
 class SearchTaskCreateRequest(CamelModel):
     telegram_id: str = Field(..., description="Target Telegram chat identifier")
     text: str = Field(..., description="User query to run via AI search")
+    priority: int = Field(default=0, ge=0, le=9, description="Scheduling priority, 9 is the most urgent")
 
 
 class SearchTaskCreateResponse(CamelModel):
@@ -28,6 +29,14 @@ class SearchTaskCreateResponse(CamelModel):
     queued_at: datetime = Field(..., description="Timestamp when the task was queued")
 
 
+class SearchTaskBatchCreateRequest(CamelModel):
+    items: List[SearchTaskCreateRequest] = Field(..., min_length=1, max_length=1000, description="Tasks to enqueue")
+
+
+class SearchTaskBatchCreateResponse(CamelModel):
+    items: List[SearchTaskCreateResponse] = Field(..., description="Created tasks in request order")
+
+
 class SearchTaskRetryResponse(CamelModel):
     task_id: str
     status: SearchTaskStatus
@@ -38,6 +47,7 @@ class SearchTaskView(CamelModel):
     telegram_id: str
     text: str
     status: SearchTaskStatus
+    priority: int = 0
     short_summary: Optional[str] = None
     summary: Optional[str] = None
     error: Optional[str] = None
@@ -50,6 +60,7 @@ class PaginationMeta(CamelModel):
     page_size: int
     total_items: int
     total_pages: int
+    next_cursor: Optional[str] = Field(default=None, description="Opaque cursor for the next page, absent on the last page")
 
 
 class SearchTaskPage(CamelModel):
@@ -62,6 +73,7 @@ class RawSearchTaskMessage(CamelModel):
     telegram_id: str
     text: str
     requested_at: datetime
+    priority: int = 0
 
 
 class CompletedSearchTaskMessage(CamelModel):
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable
+
+from .database import get_connection
+from .metrics import AI_CACHE_LOOKUPS
+
+SearchResult = tuple[str, str]
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+class SearchResultCache:
+    def __init__(
+        self,
+        compute: Callable[[str], SearchResult],
+        *,
+        ttl: float,
+        max_entries: int,
+        persistent: bool = False,
+    ) -> None:
+        self._compute = compute
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._persistent = persistent
+        self._entries: OrderedDict[str, tuple[float, SearchResult]] = OrderedDict()
+        self._in_flight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, text: str) -> SearchResult:
+        if self._ttl <= 0 or self._max_entries <= 0:
+            with self._lock:
+                self.misses += 1
+            AI_CACHE_LOOKUPS.inc(result="miss")
+            return self._compute(text)
+
+        key = normalize_query(text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                AI_CACHE_LOOKUPS.inc(result="hit")
+                return entry[1]
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+            else:
+                self.coalesced += 1
+                AI_CACHE_LOOKUPS.inc(result="coalesced")
+
+        if not owner:
+            return future.result()
+
+        try:
+            result = self._load_persistent(key)
+            if result is None:
+                result = self._compute(text)
+                with self._lock:
+                    self.misses += 1
+                AI_CACHE_LOOKUPS.inc(result="miss")
+                self._store_persistent(key, result)
+            else:
+                with self._lock:
+                    self.persistent_hits += 1
+                AI_CACHE_LOOKUPS.inc(result="persistent_hit")
+            self._remember(key, result)
+            future.set_result(result)
+            return result
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "persistent_hits": self.persistent_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+            }
+
+    def _remember(self, key: str, result: SearchResult) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self._ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def _load_persistent(self, key: str) -> SearchResult | None:
+        if not self._persistent:
+            return None
+        with get_connection() as conn:
+            row = conn.execute(
+                "SELECT short_summary, summary FROM ai_search_cache WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        return (row["short_summary"], row["summary"]) if row else None
+
+    def _store_persistent(self, key: str, result: SearchResult) -> None:
+        if not self._persistent:
+            return
+        now = time.time()
+        with get_connection() as conn:
+            conn.execute(
+                """
+                INSERT INTO ai_search_cache (key, short_summary, summary, expires_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    short_summary = excluded.short_summary,
+                    summary = excluded.summary,
+                    expires_at = excluded.expires_at
+                """,
+                (key, result[0], result[1], now + self._ttl),
+            )
+            conn.execute("DELETE FROM ai_search_cache WHERE expires_at <= ?", (now,))
+            conn.commit()
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import time
+
+from .database import get_connection, init_db, optimize_search_index, rebuild_search_index
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Maintain the FTS5 full-text index over search tasks")
+    parser.add_argument(
+        "action",
+        choices=("rebuild", "optimize", "check"),
+        help="rebuild: reindex search_tasks from scratch; optimize: merge index segments; check: verify the index",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    started = time.perf_counter()
+    with get_connection() as conn:
+        if args.action == "rebuild":
+            rebuild_search_index(conn)
+        elif args.action == "optimize":
+            optimize_search_index(conn)
+        else:
+            conn.execute("INSERT INTO search_tasks_fts (search_tasks_fts, rank) VALUES ('integrity-check', 1)")
+    logger.info("Search index %s finished in %.1fs", args.action, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import html
+import json
+from typing import Any, Callable, Iterable, Sequence
+
+from .repository import SNIPPET_CLOSE, SNIPPET_OPEN, SearchTask, encode_row_cursor
+
+try:
+    from json.encoder import c_encode_basestring as _encode_basestring
+except ImportError:
+    from json.encoder import py_encode_basestring as _encode_basestring
+
+
+def _string(value: Any) -> str:
+    return "null" if value is None else _encode_basestring(value)
+
+
+def _integer(value: int) -> str:
+    return str(int(value))
+
+
+def _timestamp(value: str) -> str:
+    if value.endswith("+00:00"):
+        value = value[:-6] + "Z"
+    return f'"{value}"'
+
+
+_TASK_FIELDS: tuple[tuple[str, str, Callable[[Any], str]], ...] = (
+    ("id", "taskId", _string),
+    ("telegram_id", "telegramId", _string),
+    ("text", "text", _string),
+    ("status", "status", _string),
+    ("priority", "priority", _integer),
+    ("short_summary", "shortSummary", _string),
+    ("summary", "summary", _string),
+    ("error", "error", _string),
+    ("created_at", "createdAt", _timestamp),
+    ("updated_at", "updatedAt", _timestamp),
+)
+_TASK_COLUMNS = tuple(column for column, _, _ in _TASK_FIELDS)
+_TASK_ENCODERS = tuple(
+    (("{" if index == 0 else ",") + f'"{key}":', encode)
+    for index, (_, key, encode) in enumerate(_TASK_FIELDS)
+)
+
+
+def _task_values_json(values: Iterable[Any]) -> str:
+    return "".join([prefix + encode(value) for (prefix, encode), value in zip(_TASK_ENCODERS, values)]) + "}"
+
+
+def task_row_json(row: Any) -> str:
+    return _task_values_json(row[column] for column in _TASK_COLUMNS)
+
+
+def task_export_lines(rows: Sequence[Any]) -> bytes:
+    return "".join(
+        [f'{task_row_json(row)[:-1]},"cursor":"{encode_row_cursor(row)}"}}\n' for row in rows]
+    ).encode("utf-8")
+
+
+def task_json(task: SearchTask) -> str:
+    return _task_values_json(
+        (
+            task.id,
+            task.telegram_id,
+            task.text,
+            task.status.value,
+            task.priority,
+            task.short_summary,
+            task.summary,
+            task.error,
+            task.created_at.isoformat(),
+            task.updated_at.isoformat(),
+        )
+    )
+
+
+def render_snippet(value: str | None) -> str | None:
+    if value is None:
+        return None
+    return html.escape(value).replace(SNIPPET_OPEN, "<mark>").replace(SNIPPET_CLOSE, "</mark>")
+
+
+def task_search_row_json(row: Any) -> str:
+    return f'{task_row_json(row)[:-1]},"snippet":{_string(render_snippet(row["snippet"]))}}}'
+
+
+def task_page_json(rows: Sequence[Any], meta: dict[str, Any], *, snippets: bool = False) -> bytes:
+    meta_json = json.dumps(
+        {
+            "page": meta["page"],
+            "pageSize": meta["page_size"],
+            "totalItems": meta["total_items"],
+            "totalPages": meta["total_pages"],
+            "nextCursor": meta["next_cursor"],
+        },
+        separators=(",", ":"),
+    )
+    render = task_search_row_json if snippets else task_row_json
+    data = ",".join([render(row) for row in rows])
+    return f'{{"data":[{data}],"meta":{meta_json}}}'.encode("utf-8")
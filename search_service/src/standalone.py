@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import threading
+
+import uvicorn
+
+from . import api, publisher, worker
+from .config import settings
+from .database import init_db
+from .queueing import consume_completed_tasks, consume_raw_tasks
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run API, worker, publisher and outbox relay in one process")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--worker-concurrency",
+        type=int,
+        default=settings.worker_concurrency,
+        help="Number of tasks processed in parallel (WORKER_CONCURRENCY)",
+    )
+    parser.add_argument(
+        "--publisher-concurrency",
+        type=int,
+        default=settings.publisher_concurrency,
+        help="Number of Telegram deliveries in flight (PUBLISHER_CONCURRENCY)",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    logging.basicConfig(level=logging.INFO)
+    settings.broker_backend = "memory"
+    settings.outbox_relay_embedded = True
+    init_db()
+    stop_event = threading.Event()
+    worker_concurrency = max(1, args.worker_concurrency)
+    publisher_concurrency = max(1, args.publisher_concurrency)
+    consumers = [
+        threading.Thread(
+            target=consume_raw_tasks,
+            args=(worker.handle,),
+            kwargs={
+                "prefetch_count": worker_concurrency * 2,
+                "concurrency": worker_concurrency,
+                "stop_event": stop_event,
+                "fair": settings.worker_fair_scheduling,
+                "user_max_in_flight": settings.worker_user_max_in_flight,
+            },
+            name="raw-consumer",
+            daemon=True,
+        ),
+        threading.Thread(
+            target=consume_completed_tasks,
+            args=(publisher._handle,),
+            kwargs={
+                "prefetch_count": settings.publisher_prefetch
+                or publisher_concurrency * max(2, settings.publisher_coalesce_max_batch),
+                "concurrency": publisher_concurrency,
+                "stop_event": stop_event,
+            },
+            name="completed-consumer",
+            daemon=True,
+        ),
+    ]
+
+    def _drain() -> None:
+        stop_event.set()
+        publisher.coalescer.flush()
+        for consumer in consumers:
+            consumer.join()
+        worker.status_writer.close()
+        publisher.coalescer.close()
+        publisher.publisher.close()
+
+    api.app.router.on_shutdown.insert(0, _drain)
+    for consumer in consumers:
+        consumer.start()
+    logger.info(
+        "Standalone mode with worker_concurrency=%d publisher_concurrency=%d",
+        worker_concurrency,
+        publisher_concurrency,
+    )
+    try:
+        uvicorn.run(api.app, host=args.host, port=args.port)
+    finally:
+        stop_event.set()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from .repository import SearchTask, StatusWrite, apply_status_writes
+from .statuses import SearchTaskStatus
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class StatusWriter:
+    def __init__(self, *, flush_interval: float, max_batch: int) -> None:
+        self._flush_interval = flush_interval
+        self._max_batch = max(1, max_batch)
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def update_status(self, task_id: str, status: SearchTaskStatus) -> Future:
+        return self._submit(StatusWrite(task_id=task_id, status=status))
+
+    def save_result(
+        self,
+        task_id: str,
+        short_summary: str,
+        summary: str,
+        status: SearchTaskStatus,
+        error: str | None = None,
+    ) -> Future:
+        return self._submit(
+            StatusWrite(
+                task_id=task_id,
+                status=status,
+                is_result=True,
+                short_summary=short_summary,
+                summary=summary,
+                error=error,
+            )
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _submit(self, write: StatusWrite) -> Future:
+        future: Future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="status-writer", daemon=True)
+                self._thread.start()
+        self._queue.put((write, future))
+        return future
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self._flush_interval
+            while len(batch) < self._max_batch:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+
+    def _flush(self, batch: list[tuple[StatusWrite, Future]]) -> None:
+        try:
+            tasks: list[SearchTask | None] = apply_status_writes([write for write, _ in batch])
+        except Exception as exc:
+            logger.exception("Failed to flush %d status writes", len(batch))
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        for (_, future), task in zip(batch, tasks):
+            future.set_result(task)
@@ -8,3 +8,6 @@ class SearchTaskStatus(str, Enum):
     PROCESSING = "processing"
     DONE = "done"
     FAILED = "failed"
+
+
+TERMINAL_STATUSES = frozenset({SearchTaskStatus.DONE, SearchTaskStatus.FAILED})
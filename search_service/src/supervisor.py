@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import argparse
+import itertools
+import logging
+import math
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from .config import settings
+from .database import init_db
+from .queueing import close_broker, queue_depth
+from .repository import count_delivered_since, count_finished_since
+
+logger = logging.getLogger(__name__)
+
+THROUGHPUT_WINDOW = 60.0
+STABLE_AFTER = 30.0
+MAX_RESTART_DELAY = 30.0
+
+
+def _publisher_env(max_processes: int) -> dict[str, str]:
+    return {"TELEGRAM_GLOBAL_RATE": str(settings.telegram_global_rate / max_processes)}
+
+
+@dataclass(slots=True)
+class Role:
+    module: str
+    queue: Callable[[], str]
+    completed_since: Callable[[datetime], int]
+    env: Callable[[int], dict[str, str]]
+
+
+ROLES: dict[str, Role] = {
+    "worker": Role(
+        module=f"{__package__}.worker",
+        queue=lambda: settings.raw_queue_name,
+        completed_since=count_finished_since,
+        env=lambda max_processes: {},
+    ),
+    "publisher": Role(
+        module=f"{__package__}.publisher",
+        queue=lambda: settings.completed_queue_name,
+        completed_since=count_delivered_since,
+        env=_publisher_env,
+    ),
+}
+
+
+@dataclass(slots=True)
+class Child:
+    slot: int
+    process: subprocess.Popen
+    started_at: float
+
+
+def desired_processes(
+    depth: int,
+    rate_per_process: float,
+    current: int,
+    *,
+    minimum: int,
+    maximum: int,
+    target_drain: float,
+) -> int:
+    if depth <= 0:
+        wanted = minimum
+    elif rate_per_process <= 0:
+        wanted = current + 1
+    else:
+        wanted = math.ceil(depth / (rate_per_process * target_drain))
+    wanted = max(minimum, min(maximum, wanted))
+    return max(wanted, current - 1)
+
+
+class Supervisor:
+    def __init__(
+        self,
+        role: Role,
+        child_args: list[str],
+        *,
+        min_processes: int,
+        max_processes: int,
+        scale_interval: float,
+        target_drain: float,
+        drain_timeout: float,
+    ) -> None:
+        self.role = role
+        self.child_args = child_args
+        self.min_processes = max(1, min_processes)
+        self.max_processes = max(self.min_processes, max_processes)
+        self.scale_interval = scale_interval
+        self.target_drain = target_drain
+        self.drain_timeout = drain_timeout
+        self.target = self.min_processes
+        self._children: dict[int, Child] = {}
+        self._retiring: list[Child] = []
+        self._failures: dict[int, int] = {}
+        self._restart_at: dict[int, float] = {}
+
+    def _active(self) -> int:
+        return len(self._children) + len(self._restart_at)
+
+    def _spawn(self, slot: int) -> None:
+        env = dict(os.environ, **self.role.env(self.max_processes))
+        if settings.metrics_port:
+            env["METRICS_PORT"] = str(settings.metrics_port + slot)
+        process = subprocess.Popen([sys.executable, "-m", self.role.module, *self.child_args], env=env)
+        self._children[slot] = Child(slot, process, time.monotonic())
+        logger.info("Started %s slot %d pid %d", self.role.module, slot, process.pid)
+
+    def _free_slot(self) -> int:
+        used = set(self._children) | set(self._restart_at) | {child.slot for child in self._retiring}
+        return next(slot for slot in itertools.count() if slot not in used)
+
+    def _reap(self) -> None:
+        now = time.monotonic()
+        for slot, child in list(self._children.items()):
+            code = child.process.poll()
+            if code is None:
+                continue
+            del self._children[slot]
+            uptime = now - child.started_at
+            failures = 0 if uptime >= STABLE_AFTER else self._failures.get(slot, 0) + 1
+            self._failures[slot] = failures
+            delay = min(MAX_RESTART_DELAY, 2 ** failures - 1)
+            logger.warning(
+                "Slot %d pid %d exited with code %s after %.0fs, restarting in %.0fs",
+                slot,
+                child.process.pid,
+                code,
+                uptime,
+                delay,
+            )
+            self._restart_at[slot] = now + delay
+        for child in list(self._retiring):
+            if child.process.poll() is not None:
+                self._retiring.remove(child)
+                logger.info("Slot %d pid %d drained", child.slot, child.process.pid)
+        for slot, restart_at in list(self._restart_at.items()):
+            if now >= restart_at:
+                del self._restart_at[slot]
+                self._spawn(slot)
+
+    def _resize(self) -> None:
+        while self._active() < self.target:
+            self._spawn(self._free_slot())
+        while self._active() > self.target:
+            if self._restart_at:
+                self._restart_at.pop(max(self._restart_at))
+                continue
+            child = self._children.pop(max(self._children))
+            child.process.send_signal(signal.SIGTERM)
+            self._retiring.append(child)
+            logger.info("Retiring slot %d pid %d", child.slot, child.process.pid)
+
+    def autoscale(self) -> None:
+        try:
+            depth = queue_depth(self.role.queue())
+            completed = self.role.completed_since(datetime.now(timezone.utc) - timedelta(seconds=THROUGHPUT_WINDOW))
+        except Exception as exc:
+            logger.warning("Autoscaling skipped, cannot measure %s: %r", self.role.queue(), exc)
+            return
+        current = self._active()
+        rate_per_process = completed / THROUGHPUT_WINDOW / max(1, current)
+        target = desired_processes(
+            depth,
+            rate_per_process,
+            current,
+            minimum=self.min_processes,
+            maximum=self.max_processes,
+            target_drain=self.target_drain,
+        )
+        if target != self.target:
+            logger.info(
+                "Scaling %s from %d to %d processes: depth=%d rate_per_process=%.2f/s",
+                self.role.module,
+                current,
+                target,
+                depth,
+                rate_per_process,
+            )
+        self.target = target
+
+    def run(self, stop_event: threading.Event) -> None:
+        next_scale = time.monotonic() + self.scale_interval
+        self._resize()
+        while not stop_event.is_set():
+            self._reap()
+            if self.min_processes < self.max_processes and time.monotonic() >= next_scale:
+                self.autoscale()
+                next_scale = time.monotonic() + self.scale_interval
+            self._resize()
+            stop_event.wait(0.5)
+        self.drain()
+
+    def drain(self) -> None:
+        self._restart_at.clear()
+        children = [*self._children.values(), *self._retiring]
+        logger.info("Draining %d %s processes", len(children), self.role.module)
+        for child in children:
+            if child.process.poll() is None:
+                child.process.send_signal(signal.SIGTERM)
+        deadline = time.monotonic() + self.drain_timeout
+        for child in children:
+            try:
+                child.process.wait(max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                logger.warning("Slot %d pid %d did not drain in time, killing", child.slot, child.process.pid)
+                child.process.kill()
+                child.process.wait()
+        self._children.clear()
+        self._retiring.clear()
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Run worker or publisher consumers as a pool of processes scaled by queue depth",
+        epilog="Arguments after -- are passed to every child, e.g. -- --concurrency 8",
+    )
+    parser.add_argument("role", choices=sorted(ROLES))
+    parser.add_argument(
+        "--min-processes",
+        type=int,
+        default=settings.supervisor_min_processes,
+        help="Processes kept running when the queue is empty (SUPERVISOR_MIN_PROCESSES)",
+    )
+    parser.add_argument(
+        "--max-processes",
+        type=int,
+        default=settings.supervisor_max_processes,
+        help="Upper bound for autoscaling, equal to --min-processes disables it (SUPERVISOR_MAX_PROCESSES)",
+    )
+    parser.add_argument(
+        "--scale-interval",
+        type=float,
+        default=settings.supervisor_scale_interval,
+        help="Seconds between queue depth checks (SUPERVISOR_SCALE_INTERVAL)",
+    )
+    parser.add_argument(
+        "--target-drain-seconds",
+        type=float,
+        default=settings.supervisor_target_drain,
+        help="Scale so the current backlog is processed within this time (SUPERVISOR_TARGET_DRAIN_SECONDS)",
+    )
+    parser.add_argument(
+        "--drain-timeout",
+        type=float,
+        default=settings.supervisor_drain_timeout,
+        help="Seconds to wait for children after SIGTERM before killing them (SUPERVISOR_DRAIN_TIMEOUT)",
+    )
+    argv = sys.argv[1:]
+    split = argv.index("--") if "--" in argv else len(argv)
+    args = parser.parse_args(argv[:split])
+    args.child_args = argv[split + 1 :]
+    return args
+
+
+def main() -> None:
+    args = _parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if settings.broker_backend != "rabbitmq":
+        raise SystemExit("The supervisor needs BROKER_BACKEND=rabbitmq, use standalone for the in-process broker")
+    init_db()
+    stop_event = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stop_event.set())
+    supervisor = Supervisor(
+        ROLES[args.role],
+        args.child_args,
+        min_processes=args.min_processes,
+        max_processes=args.max_processes,
+        scale_interval=args.scale_interval,
+        target_drain=args.target_drain_seconds,
+        drain_timeout=args.drain_timeout,
+    )
+    try:
+        supervisor.run(stop_event)
+    finally:
+        close_broker()
+
+
+if __name__ == "__main__":
+    main()
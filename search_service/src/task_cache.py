@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from email.utils import format_datetime
+from typing import Callable
+
+from .repository import SearchTask
+from .statuses import TERMINAL_STATUSES
+
+
+@dataclass(slots=True)
+class CachedTaskView:
+    body: bytes
+    etag: str
+    last_modified: str
+    expires_at: float
+    updated_at: datetime
+    checked_at: float
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+
+class TaskViewCache:
+    def __init__(
+        self,
+        load: Callable[[str], SearchTask | None],
+        render: Callable[[SearchTask], bytes],
+        *,
+        terminal_ttl: float,
+        active_ttl: float,
+        max_entries: int,
+        updated_at: Callable[[str], datetime | None] | None = None,
+        revalidate_after: float = 0.0,
+    ) -> None:
+        self._load = load
+        self._render = render
+        self._updated_at = updated_at
+        self._revalidate_after = revalidate_after if updated_at is not None else 0.0
+        self._terminal_ttl = terminal_ttl
+        self._active_ttl = active_ttl
+        self._max_entries = max_entries
+        self._entries: OrderedDict[str, CachedTaskView] = OrderedDict()
+        self._invalidated: OrderedDict[str, int] = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+
+    def peek(self, task_id: str) -> CachedTaskView | None:
+        with self._lock:
+            entry = self._entries.get(task_id)
+            if entry is None:
+                return None
+            now = time.monotonic()
+            if entry.expires_at <= now:
+                del self._entries[task_id]
+                return None
+            if self._revalidate_after and now - entry.checked_at >= self._revalidate_after:
+                return None
+            self._entries.move_to_end(task_id)
+            self.hits += 1
+            return entry
+
+    def get(self, task_id: str) -> CachedTaskView | None:
+        entry = self.peek(task_id)
+        if entry is not None:
+            return entry
+        with self._lock:
+            generation = self._generation
+            stale = self._entries.get(task_id)
+        if stale is not None and self._updated_at is not None and self._updated_at(task_id) == stale.updated_at:
+            with self._lock:
+                stale.checked_at = time.monotonic()
+                self.revalidated += 1
+            return stale
+        with self._lock:
+            self.misses += 1
+        task = self._load(task_id)
+        if task is None:
+            return None
+        entry = self._build(task)
+        if self._max_entries > 0:
+            self._remember(task_id, entry, generation)
+        return entry
+
+    def _build(self, task: SearchTask) -> CachedTaskView:
+        body = self._render(task)
+        ttl = self._terminal_ttl if task.status in TERMINAL_STATUSES else self._active_ttl
+        now = time.monotonic()
+        return CachedTaskView(
+            body=body,
+            etag=f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"',
+            last_modified=format_datetime(task.updated_at, usegmt=True),
+            expires_at=now + ttl,
+            updated_at=task.updated_at,
+            checked_at=now,
+        )
+
+    def _remember(self, task_id: str, entry: CachedTaskView, generation: int) -> None:
+        with self._lock:
+            if self._invalidated.get(task_id, -1) >= generation:
+                return
+            self._entries[task_id] = entry
+            self._entries.move_to_end(task_id)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, task: SearchTask) -> None:
+        with self._lock:
+            self._entries.pop(task.id, None)
+            self._invalidated[task.id] = self._generation
+            self._invalidated.move_to_end(task.id)
+            self._generation += 1
+            while len(self._invalidated) > max(self._max_entries, 1):
+                self._invalidated.popitem(last=False)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidated": self.revalidated,
+            }
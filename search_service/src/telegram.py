@@ -1,67 +1,215 @@
 from __future__ import annotations
 
+import html
+import http.client
 import json
 import logging
-import os
-import time
+import queue
 import urllib.parse
-import urllib.request
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Optional, Sequence
 
-from .repository import record_completed_message
+from .config import settings
+from .queueing import RetryableError
+from .ratelimit import KeyedTokenBuckets, TokenBucket
+from .repository import record_completed_messages
 
 logger = logging.getLogger(__name__)
 
+MESSAGE_LIMIT = 4096
+BLOCK_SEPARATOR = "\n\n—\n\n"
+_BOUNDARIES = ("\n\n", "\n", ". ", " ")
+
+
+class DeliveryError(RetryableError):
+    def __init__(self, message: str, *, retry_after: float | None = None, delivered: int = 0) -> None:
+        super().__init__(message, retry_after=retry_after)
+        self.delivered = delivered
+
+
+def _text_length(text: str) -> int:
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _prefix_end(text: str, limit: int) -> int:
+    encoded = text[:limit].encode("utf-16-le")
+    if len(encoded) <= limit * 2:
+        return min(len(text), limit)
+    cut = limit * 2
+    if 0xD800 <= int.from_bytes(encoded[cut - 2 : cut], "little") <= 0xDBFF:
+        cut -= 2
+    return max(1, len(encoded[:cut].decode("utf-16-le")))
+
+
+def split_text(text: str, limit: int = MESSAGE_LIMIT) -> list[str]:
+    chunks: list[str] = []
+    text = text.strip()
+    while _text_length(text) > limit:
+        end = _prefix_end(text, limit)
+        cut = end
+        for boundary in _BOUNDARIES:
+            index = text.rfind(boundary, end // 2, end)
+            if index > 0:
+                cut = index + len(boundary.rstrip())
+                break
+        chunks.append(text[:cut].rstrip())
+        text = text[cut:].lstrip()
+    if text:
+        chunks.append(text)
+    return chunks
+
+
+def pack_messages(blocks: Sequence[str], limit: int = MESSAGE_LIMIT) -> list[tuple[str, int]]:
+    messages: list[tuple[str, int]] = []
+    current: list[str] = []
+    length = 0
+    separator_length = _text_length(BLOCK_SEPARATOR)
+    for index, block in enumerate(blocks):
+        block_length = _text_length(block)
+        if current and length + separator_length + block_length <= limit:
+            current.append(block)
+            length += separator_length + block_length
+            continue
+        if current:
+            messages.append((BLOCK_SEPARATOR.join(current), index))
+            current, length = [], 0
+        if block_length <= limit:
+            current, length = [block], block_length
+        else:
+            messages.extend((chunk, index) for chunk in split_text(block, limit))
+            messages[-1] = (messages[-1][0], index + 1)
+    if current:
+        messages.append((BLOCK_SEPARATOR.join(current), len(blocks)))
+    return messages
+
+
+class HTTPConnectionPool:
+    def __init__(self, base_url: str, *, max_size: int, timeout: float) -> None:
+        parsed = urllib.parse.urlsplit(base_url)
+        self._connection_class = (
+            http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
+        )
+        self._host = parsed.hostname or "localhost"
+        self._port = parsed.port
+        self._prefix = parsed.path.rstrip("/")
+        self._timeout = timeout
+        self._idle: queue.LifoQueue[http.client.HTTPConnection] = queue.LifoQueue(maxsize=max_size)
+
+    def _acquire(self) -> tuple[http.client.HTTPConnection, bool]:
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            return self._connection_class(self._host, self._port, timeout=self._timeout), False
+
+    def _release(self, connection: http.client.HTTPConnection) -> None:
+        try:
+            self._idle.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def post(self, path: str, body: bytes, headers: dict[str, str]) -> tuple[int, bytes]:
+        while True:
+            connection, reused = self._acquire()
+            try:
+                connection.request("POST", self._prefix + path, body=body, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, ConnectionError):
+                connection.close()
+                if reused:
+                    continue
+                raise
+            except OSError:
+                connection.close()
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(connection)
+            return response.status, data
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
 
 class TelegramPublisher:
-    def __init__(self, token: Optional[str], chat_id: Optional[str]) -> None:
+    def __init__(
+        self,
+        token: Optional[str],
+        chat_id: Optional[str],
+        *,
+        api_url: Optional[str] = None,
+        pool_size: Optional[int] = None,
+        global_rate: Optional[float] = None,
+        chat_rate: Optional[float] = None,
+    ) -> None:
         self.token = token
         self.chat_id = chat_id
-        try:
-            self.max_retries = int(os.getenv("TELEGRAM_MAX_RETRIES", "3"))
-        except ValueError:
-            self.max_retries = 3
-        try:
-            self.retry_delay = float(os.getenv("TELEGRAM_RETRY_DELAY", "5"))
-        except ValueError:
-            self.retry_delay = 5.0
+        self.pool = HTTPConnectionPool(
+            api_url or settings.telegram_api_url,
+            max_size=pool_size or settings.publisher_concurrency,
+            timeout=settings.telegram_timeout,
+        )
+        global_rate = global_rate or settings.telegram_global_rate
+        chat_rate = chat_rate or settings.telegram_chat_rate
+        self.global_bucket = TokenBucket(global_rate, 1)
+        self.chat_buckets = KeyedTokenBuckets(chat_rate, 1)
 
     @staticmethod
     def _now() -> datetime:
         return datetime.now(timezone.utc)
 
+    def _post_message(self, chat_id: str, text: str) -> tuple[bool, float | None]:
+        chat_bucket = self.chat_buckets.get(chat_id)
+        self.global_bucket.acquire()
+        chat_bucket.acquire()
+        data = urllib.parse.urlencode({"chat_id": chat_id, "text": text, "parse_mode": "HTML"}).encode("utf-8")
+        status, body = self.pool.post(
+            f"/bot{self.token}/sendMessage",
+            data,
+            {"Content-Type": "application/x-www-form-urlencoded"},
+        )
+        try:
+            result = json.loads(body)
+        except json.JSONDecodeError:
+            return 200 <= status < 300, None
+        if result.get("ok"):
+            return True, None
+        retry_after = (result.get("parameters") or {}).get("retry_after")
+        if status == 429 and retry_after:
+            chat_bucket.pause(float(retry_after))
+            logger.warning("Telegram throttled chat %s for %ss", chat_id, retry_after)
+            return False, float(retry_after)
+        return False, None
+
     def send(self, task_id: str, telegram_id: str, short_summary: str, summary: str) -> None:
-        delivered_at: Optional[datetime] = None
-        if self.token and self.chat_id:
-            url = f"https://api.telegram.org/bot{self.token}/sendMessage"
-            payload = {
-                "chat_id": self.chat_id,
-                "text": f"{short_summary}\n\n{summary}",
-                "parse_mode": "HTML",
-            }
-            data = urllib.parse.urlencode(payload).encode("utf-8")
-            request = urllib.request.Request(url, data=data)
-            for attempt in range(1, self.max_retries + 1):
+        self.send_batch(telegram_id, [(task_id, short_summary, summary)])
+
+    def send_batch(self, telegram_id: str, results: Sequence[tuple[str, str, str]]) -> None:
+        task_ids = [task_id for task_id, _, _ in results]
+        blocks = [f"{short_summary}\n\n{summary}" for _, short_summary, summary in results]
+        delivered = 0
+        for text, completed in pack_messages(blocks):
+            if self.token:
                 try:
-                    with urllib.request.urlopen(request, timeout=10) as response:
-                        body = response.read()
-                        try:
-                            result = json.loads(body)
-                            if result.get("ok"):
-                                delivered_at = self._now()
-                                break
-                        except json.JSONDecodeError:
-                            delivered_at = self._now()
-                            break
-                    logger.warning("Telegram API responded without OK flag on attempt %d", attempt)
-                except Exception as exc:
-                    logger.warning("Failed to send Telegram message on attempt %d: %s", attempt, exc)
-                if attempt < self.max_retries:
-                    time.sleep(self.retry_delay)
-        else:
-            logger.warning("[telegram] Task %s: %s\n%s", task_id, short_summary, summary)
-            delivered_at = self._now()
+                    ok, retry_after = self._post_message(self.chat_id or telegram_id, html.escape(text, quote=False))
+                except (http.client.HTTPException, OSError) as exc:
+                    raise DeliveryError(f"Telegram request failed: {exc}", delivered=delivered) from exc
+                if not ok:
+                    raise DeliveryError(
+                        "Telegram API responded without OK flag",
+                        retry_after=retry_after,
+                        delivered=delivered,
+                    )
+            else:
+                logger.warning("[telegram] Tasks %s:\n%s", ", ".join(task_ids[delivered:completed]), text)
+            if completed > delivered:
+                record_completed_messages(task_ids[delivered:completed], telegram_id, self._now())
+                delivered = completed
 
-        if delivered_at:
-            record_completed_message(task_id, telegram_id, short_summary, summary, delivered_at)
+    def close(self) -> None:
+        self.pool.close()
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import zlib
+from typing import Any, TypeVar
+
+from pydantic import BaseModel
+
+from .config import settings
+from .schemas import CompletedSearchTaskMessage, RawSearchTaskMessage
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+ZLIB_ENCODING = "zlib"
+
+_LAYOUTS: dict[type[BaseModel], dict[int, tuple[str, ...]]] = {
+    RawSearchTaskMessage: {
+        1: ("task_id", "telegram_id", "text", "requested_at"),
+        2: ("task_id", "telegram_id", "text", "requested_at", "priority"),
+    },
+    CompletedSearchTaskMessage: {
+        1: ("task_id", "telegram_id", "status", "short_summary", "summary", "completed_at"),
+    },
+}
+_CURRENT: dict[type[BaseModel], tuple[int, tuple[str, ...]]] = {
+    model: max(layouts.items()) for model, layouts in _LAYOUTS.items()
+}
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+class WireFormatError(ValueError):
+    pass
+
+
+def msgpack_available() -> bool:
+    return msgpack is not None
+
+
+def encode(
+    message: BaseModel,
+    *,
+    wire_format: str | None = None,
+    compress_min_bytes: int | None = None,
+) -> tuple[bytes, str, str | None]:
+    wire_format = wire_format or settings.message_format
+    if compress_min_bytes is None:
+        compress_min_bytes = settings.message_compress_min_bytes
+    if wire_format == "json":
+        return message.model_dump_json(by_alias=True).encode("utf-8"), JSON_CONTENT_TYPE, None
+    if wire_format != "msgpack":
+        raise WireFormatError(f"Unknown message format: {wire_format}")
+    if msgpack is None:
+        raise WireFormatError("MESSAGE_FORMAT=msgpack requires the msgpack package")
+    version, fields = _CURRENT[type(message)]
+    body = msgpack.packb([version, *(getattr(message, name) for name in fields)], datetime=True)
+    if 0 < compress_min_bytes <= len(body):
+        return zlib.compress(body, 6), MSGPACK_CONTENT_TYPE, ZLIB_ENCODING
+    return body, MSGPACK_CONTENT_TYPE, None
+
+
+def decode(
+    model: type[ModelT],
+    body: bytes,
+    content_type: str | None = None,
+    content_encoding: str | None = None,
+) -> ModelT:
+    if content_encoding == ZLIB_ENCODING:
+        try:
+            body = zlib.decompress(body)
+        except zlib.error as exc:
+            raise WireFormatError(f"Corrupt zlib payload: {exc}") from exc
+    elif content_encoding:
+        raise WireFormatError(f"Unsupported content encoding: {content_encoding}")
+    if content_type is None or content_type == JSON_CONTENT_TYPE:
+        return model.model_validate_json(body)
+    if content_type != MSGPACK_CONTENT_TYPE:
+        raise WireFormatError(f"Unsupported content type: {content_type}")
+    if msgpack is None:
+        raise WireFormatError("Received a msgpack message but the msgpack package is not installed")
+    try:
+        values: Any = msgpack.unpackb(body, timestamp=3)
+    except (ValueError, msgpack.UnpackException) as exc:
+        raise WireFormatError(f"Corrupt msgpack payload: {exc}") from exc
+    fields = _LAYOUTS[model].get(values[0]) if isinstance(values, list) and values and isinstance(values[0], int) else None
+    if fields is None or len(values) != len(fields) + 1:
+        raise WireFormatError(f"Unsupported {model.__name__} wire layout")
+    return model.model_validate(dict(zip(fields, values[1:])))
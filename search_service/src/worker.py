@@ -1,18 +1,35 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
-
+import argparse
 import logging
+import signal
+import threading
+import time
+from datetime import datetime, timezone
 
 from .ai_search import run_ai_search
+from .config import settings
 from .database import init_db
-from .queueing import consume_raw_tasks
-from .repository import save_result, update_status
+from .metrics import AI_SEARCH_DURATION, QUEUE_WAIT, start_metrics_server
+from .queueing import close_broker, consume_raw_tasks
 from .schemas import CompletedSearchTaskMessage, RawSearchTaskMessage
+from .search_cache import SearchResultCache
+from .status_writer import StatusWriter
 from .statuses import SearchTaskStatus
 
 logger = logging.getLogger(__name__)
 
+search_cache = SearchResultCache(
+    run_ai_search,
+    ttl=settings.ai_cache_ttl,
+    max_entries=settings.ai_cache_max_entries,
+    persistent=settings.ai_cache_persistent,
+)
+status_writer = StatusWriter(
+    flush_interval=settings.status_flush_interval,
+    max_batch=settings.status_flush_max_batch,
+)
+
 
 def _utcnow() -> datetime:
     return datetime.now(timezone.utc)
@@ -20,14 +37,17 @@ def _utcnow() -> datetime:
 
 def handle(task: RawSearchTaskMessage) -> CompletedSearchTaskMessage:
     logger.info("Processing task %s", task.task_id)
-    update_status(task.task_id, SearchTaskStatus.PROCESSING)
-    short_summary, summary = run_ai_search(task.text)
-    save_result(
+    QUEUE_WAIT.observe((_utcnow() - task.requested_at).total_seconds())
+    status_writer.update_status(task.task_id, SearchTaskStatus.PROCESSING)
+    started = time.perf_counter()
+    short_summary, summary = search_cache.get(task.text)
+    AI_SEARCH_DURATION.observe(time.perf_counter() - started)
+    status_writer.save_result(
         task_id=task.task_id,
         short_summary=short_summary,
         summary=summary,
         status=SearchTaskStatus.DONE,
-    )
+    ).result()
     completed_at = _utcnow()
     logger.info("Task %s processed successfully", task.task_id)
     return CompletedSearchTaskMessage(
@@ -40,10 +60,72 @@ def handle(task: RawSearchTaskMessage) -> CompletedSearchTaskMessage:
     )
 
 
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Process raw search tasks from RabbitMQ")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.worker_concurrency,
+        help="Number of tasks processed in parallel (WORKER_CONCURRENCY)",
+    )
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=settings.worker_prefetch,
+        help="Broker prefetch count, defaults to twice the concurrency or four times with fair scheduling (WORKER_PREFETCH)",
+    )
+    parser.add_argument(
+        "--fair",
+        action=argparse.BooleanOptionalAction,
+        default=settings.worker_fair_scheduling,
+        help="Interleave prefetched tasks across telegram users (WORKER_FAIR_SCHEDULING)",
+    )
+    parser.add_argument(
+        "--user-max-in-flight",
+        type=int,
+        default=settings.worker_user_max_in_flight,
+        help="Maximum tasks of one telegram user processed at once, 0 disables (WORKER_USER_MAX_IN_FLIGHT)",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=settings.metrics_port,
+        help="Serve Prometheus metrics on this port, 0 disables (METRICS_PORT)",
+    )
+    return parser.parse_args()
+
+
 def main() -> None:
+    args = _parse_args()
     logging.basicConfig(level=logging.INFO)
     init_db()
-    consume_raw_tasks(handle, prefetch_count=1)
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port)
+    stop_event = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stop_event.set())
+    concurrency = max(1, args.concurrency)
+    prefetch = args.prefetch if args.prefetch > 0 else concurrency * (4 if args.fair else 2)
+    logger.info(
+        "Worker started with concurrency=%d prefetch=%d fair=%s user_max_in_flight=%d",
+        concurrency,
+        prefetch,
+        args.fair,
+        args.user_max_in_flight,
+    )
+    try:
+        consume_raw_tasks(
+            handle,
+            prefetch_count=prefetch,
+            concurrency=concurrency,
+            stop_event=stop_event,
+            fair=args.fair,
+            user_max_in_flight=max(0, args.user_max_in_flight),
+        )
+    finally:
+        logger.info("AI search cache stats: %s", search_cache.stats())
+        status_writer.close()
+        close_broker()
 
 
 if __name__ == "__main__":
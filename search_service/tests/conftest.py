@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from search_service.src.config import settings
+from search_service.src.database import close_connections, init_db
+
+
+@pytest.fixture
+def db(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Path]:
+    monkeypatch.setattr(settings, "db_path", tmp_path / "test.db")
+    init_db()
+    yield settings.db_path
+    close_connections()
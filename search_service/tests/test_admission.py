@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from search_service.src.admission import AdmissionController, AdmissionRejected, BacklogSnapshot
+
+
+def _controller(*, max_backlog: int = 0, backlog: int = 0, user_rate: float = 1, user_burst: float = 3):
+    controller = AdmissionController(
+        max_backlog=max_backlog,
+        refresh_interval=1,
+        throughput_window=60,
+        max_retry_after=300,
+        user_rate=user_rate,
+        user_burst=user_burst,
+        measure=lambda window: BacklogSnapshot(backlog=backlog, throughput=10, measured_at=time.monotonic()),
+    )
+    controller.refresh()
+    return controller
+
+
+def test_batch_items_are_charged_to_each_user_quota() -> None:
+    controller = _controller()
+    controller.admit(["a", "a", "b"])
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.admit(["a", "a"])
+    assert rejected.value.reason == "user_quota"
+    assert rejected.value.retry_after > 0
+    controller.admit(["a"])
+
+
+def test_rejected_batch_refunds_users_charged_before_the_failure() -> None:
+    controller = _controller()
+    controller.admit(["b", "b", "b"])
+    with pytest.raises(AdmissionRejected):
+        controller.admit(["a", "a", "b"])
+    controller.admit(["a", "a", "a"])
+
+
+def test_single_user_cannot_bypass_quota_with_a_large_batch() -> None:
+    controller = _controller()
+    with pytest.raises(AdmissionRejected):
+        controller.admit(["a"] * 1000)
+
+
+def test_backlog_limit_counts_batch_size() -> None:
+    controller = _controller(max_backlog=100, backlog=95, user_rate=0)
+    controller.admit(["a"] * 5)
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.admit(["b"])
+    assert rejected.value.reason == "backlog"
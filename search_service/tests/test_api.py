@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from search_service.src import api, repository
+from search_service.src.admission import admission
+from search_service.src.api import app
+
+
+def test_get_task_honours_if_none_match(db: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(admission, "max_backlog", 0)
+    with TestClient(app) as client:
+        created = client.post("/api/v1/search-tasks", json={"telegramId": "1", "text": "q"})
+        assert created.status_code == 201
+        task_id = created.json()["taskId"]
+        response = client.get(f"/api/v1/search-tasks/{task_id}")
+        assert response.status_code == 200
+        assert response.json()["status"] == "queued"
+        etag = response.headers["ETag"]
+        cached = client.get(f"/api/v1/search-tasks/{task_id}", headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.headers["ETag"] == etag
+        repository.save_result(task_id, "short", "summary", repository.SearchTaskStatus.DONE)
+        changed = client.get(f"/api/v1/search-tasks/{task_id}", headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.json()["status"] == "done"
+        assert client.get("/api/v1/search-tasks/missing").status_code == 404
+
+
+def test_event_stream_releases_subscription_when_lookup_fails(db: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    def _broken(task_id: str) -> None:
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(admission, "max_backlog", 0)
+    monkeypatch.setattr(api, "get_task", _broken)
+    with TestClient(app, raise_server_exceptions=False) as client:
+        assert client.get("/api/v1/search-tasks/some-task/events").status_code == 500
+        assert client.get("/api/v1/search-tasks/missing-task/wait?timeout=0").status_code == 500
+        assert api.task_events.subscriber_count() == 0
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import gc
+import sqlite3
+import threading
+from pathlib import Path
+
+import pytest
+
+from search_service.src import database
+from search_service.src.config import settings
+
+
+def _use_connection(connections: list[sqlite3.Connection]) -> None:
+    with database.get_connection() as conn:
+        conn.execute("SELECT 1").fetchone()
+        connections.append(conn)
+
+
+def test_connections_of_finished_threads_are_closed(db: Path) -> None:
+    connections: list[sqlite3.Connection] = []
+    for _ in range(20):
+        thread = threading.Thread(target=_use_connection, args=(connections,))
+        thread.start()
+        thread.join()
+    gc.collect()
+    assert len(database._open_connections) <= 1
+    for conn in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+
+
+def test_stale_thread_connection_is_closed_when_db_path_changes(
+    db: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    connections: list[sqlite3.Connection] = []
+    _use_connection(connections)
+    monkeypatch.setattr(settings, "db_path", tmp_path / "other.db")
+    _use_connection(connections)
+    first, second = connections
+    assert first is not second
+    with pytest.raises(sqlite3.ProgrammingError):
+        first.execute("SELECT 1")
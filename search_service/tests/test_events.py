@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from search_service.src import repository
+from search_service.src.events import TaskEventHub
+from search_service.src.statuses import SearchTaskStatus
+
+
+def test_changed_since_reads_only_requested_tasks(db: Path) -> None:
+    before = datetime.now(timezone.utc) - timedelta(seconds=1)
+    tasks = repository.create_tasks([("1", f"q{index}", 0) for index in range(1200)])
+    watched = [task.id for task in tasks[::2]]
+    changed = repository.changed_since(watched, before)
+    assert sorted(task.id for task in changed) == sorted(watched)
+    assert [task.updated_at for task in changed] == sorted(task.updated_at for task in changed)
+    assert repository.changed_since(watched, datetime.now(timezone.utc) + timedelta(seconds=1)) == []
+    assert repository.changed_since([], before) == []
+
+
+def test_hub_delivers_updates_from_other_writers(db: Path) -> None:
+    task = repository.create_task("1", "q")
+
+    async def _watch() -> SearchTaskStatus:
+        hub = TaskEventHub(0.01)
+        try:
+            with hub.subscribe(task.id) as subscription:
+                subscription.seed(repository.get_task(task.id))
+                await asyncio.sleep(0.05)
+                await asyncio.to_thread(repository.save_result, task.id, "short", "summary", SearchTaskStatus.DONE)
+                update = await subscription.next(2)
+                return update.status
+        finally:
+            hub.close()
+
+    assert asyncio.run(_watch()) == SearchTaskStatus.DONE
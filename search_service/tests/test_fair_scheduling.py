@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from search_service.src import queueing
+from search_service.src.config import settings
+from search_service.src.schemas import RawSearchTaskMessage
+
+
+@pytest.fixture
+def memory_broker(db: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    monkeypatch.setattr(settings, "broker_backend", "memory")
+    monkeypatch.setattr(queueing, "publish_completed_task", lambda result: None)
+    queueing.close_broker()
+    yield
+    queueing.close_broker()
+
+
+def _raw(task_id: str, telegram_id: str) -> RawSearchTaskMessage:
+    return RawSearchTaskMessage(task_id=task_id, telegram_id=telegram_id, text="q", requested_at=datetime.now(timezone.utc))
+
+
+def _processing_order(user_max_in_flight: int) -> list[str]:
+    messages = [_raw(f"a{index}", "A") for index in range(200)] + [_raw("b", "B")]
+    queueing.publish_payloads(settings.raw_queue_name, messages)
+    order: list[str] = []
+    lock = threading.Lock()
+
+    def _handle(message: RawSearchTaskMessage) -> None:
+        time.sleep(0.002)
+        with lock:
+            order.append(message.telegram_id)
+
+    stop_event = threading.Event()
+    consumer = threading.Thread(
+        target=queueing.consume_raw_tasks,
+        args=(_handle,),
+        kwargs={
+            "prefetch_count": 8,
+            "concurrency": 2,
+            "stop_event": stop_event,
+            "fair": True,
+            "user_max_in_flight": user_max_in_flight,
+        },
+    )
+    consumer.start()
+    deadline = time.monotonic() + 20
+    while len(order) < len(messages) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    stop_event.set()
+    consumer.join()
+    return order
+
+
+@pytest.mark.parametrize("user_max_in_flight", [0, 1])
+def test_burst_from_one_user_does_not_delay_the_next_user(memory_broker: None, user_max_in_flight: int) -> None:
+    order = _processing_order(user_max_in_flight)
+    assert len(order) == 201
+    assert order.index("B") < 20
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Iterator
+
+import pytest
+
+from search_service.src import queueing, repository
+from search_service.src.config import settings
+from search_service.src.relay import relay_once
+from search_service.src.schemas import RawSearchTaskMessage
+from search_service.src.wire import JSON_CONTENT_TYPE, MSGPACK_CONTENT_TYPE, decode
+
+
+class RecordingPublisher:
+    def __init__(self) -> None:
+        self.published: list[tuple[str, Any, Any]] = []
+
+    def publish_many(self, routing_key: str, bodies: list[Any], properties: Any) -> list[Future]:
+        futures = []
+        for body in bodies:
+            self.published.append((routing_key, body, properties))
+            future: Future = Future()
+            future.set_result(None)
+            futures.append(future)
+        return futures
+
+
+@pytest.fixture
+def publisher(db: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[RecordingPublisher]:
+    recording = RecordingPublisher()
+    monkeypatch.setattr(settings, "broker_backend", "rabbitmq")
+    monkeypatch.setattr(queueing, "get_publisher", lambda: recording)
+    queueing.close_broker()
+    yield recording
+    queueing.close_broker()
+
+
+def test_relay_encodes_raw_tasks_as_msgpack(publisher: RecordingPublisher, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "message_format", "msgpack")
+    task = repository.create_task("42", "новости", priority=3)
+    assert relay_once(10) == 1
+    ((routing_key, body, properties),) = publisher.published
+    assert routing_key == settings.raw_queue_name
+    assert properties.content_type == MSGPACK_CONTENT_TYPE
+    assert properties.priority == 3
+    message = decode(RawSearchTaskMessage, body, properties.content_type, properties.content_encoding)
+    assert (message.task_id, message.telegram_id, message.text, message.priority) == (task.id, "42", "новости", 3)
+    assert repository.count_outbox_pending() == 0
+
+
+def test_relay_passes_json_outbox_payloads_through(publisher: RecordingPublisher, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "message_format", "json")
+    task = repository.create_task("42", "новости")
+    assert relay_once(10) == 1
+    ((_, body, properties),) = publisher.published
+    assert properties.content_type == JSON_CONTENT_TYPE
+    assert decode(RawSearchTaskMessage, body.encode("utf-8"), properties.content_type).task_id == task.id
+
+
+class UnconfirmedPublisher(RecordingPublisher):
+    def __init__(self) -> None:
+        super().__init__()
+        self.futures: list[Future] = []
+
+    def publish_many(self, routing_key: str, bodies: list[Any], properties: Any) -> list[Future]:
+        futures = []
+        for body in bodies:
+            self.published.append((routing_key, body, properties))
+            future: Future = Future()
+            future.set_running_or_notify_cancel()
+            futures.append(future)
+        self.futures.extend(futures)
+        return futures
+
+
+def test_relay_does_not_republish_unconfirmed_entries(db: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    unconfirmed = UnconfirmedPublisher()
+    monkeypatch.setattr(settings, "broker_backend", "rabbitmq")
+    monkeypatch.setattr(settings, "publish_confirm_timeout", 0.01)
+    monkeypatch.setattr(queueing, "get_publisher", lambda: unconfirmed)
+    queueing.close_broker()
+    try:
+        for index in range(3):
+            repository.create_task("42", f"q{index}")
+        in_flight: dict[int, Future] = {}
+        with pytest.raises(TimeoutError):
+            relay_once(10, in_flight)
+        for _ in range(3):
+            assert relay_once(10, in_flight) == 0
+        assert len(unconfirmed.published) == 3
+        for future in unconfirmed.futures:
+            future.set_result(None)
+        assert relay_once(10, in_flight) == 0
+        assert repository.count_outbox_pending() == 0
+        assert not in_flight
+    finally:
+        queueing.close_broker()
+
+
+def test_relay_republishes_withdrawn_entries(publisher: RecordingPublisher, monkeypatch: pytest.MonkeyPatch) -> None:
+    pending: list[Future] = []
+    publish_many = publisher.publish_many
+
+    def _never_sent(routing_key: str, bodies: list[Any], properties: Any) -> list[Future]:
+        futures = [Future() for _ in bodies]
+        pending.extend(futures)
+        return futures
+
+    repository.create_task("42", "q")
+    monkeypatch.setattr(settings, "publish_confirm_timeout", 0.01)
+    monkeypatch.setattr(publisher, "publish_many", _never_sent)
+    in_flight: dict[int, Future] = {}
+    with pytest.raises(TimeoutError):
+        relay_once(10, in_flight)
+    assert pending[0].cancelled()
+    monkeypatch.setattr(publisher, "publish_many", publish_many)
+    assert relay_once(10, in_flight) == 1
+    assert len(publisher.published) == 1
+    assert repository.count_outbox_pending() == 0
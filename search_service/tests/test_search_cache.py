@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+import re
+
+from search_service.src.metrics import REGISTRY
+from search_service.src.search_cache import SearchResultCache
+
+
+def _lookups() -> dict[str, float]:
+    pattern = r'^search_ai_cache_lookups_total\{result="(\w+)"\} (\S+)$'
+    return {match[1]: float(match[2]) for match in re.finditer(pattern, REGISTRY.render(), re.MULTILINE)}
+
+
+def test_cache_lookups_are_exported_as_metrics() -> None:
+    before = _lookups()
+    cache = SearchResultCache(lambda text: (text, text), ttl=60, max_entries=10)
+    cache.get("Hello  world")
+    cache.get("hello world")
+    cache.get("other")
+    after = _lookups()
+    assert after.get("miss", 0) - before.get("miss", 0) == 2
+    assert after.get("hit", 0) - before.get("hit", 0) == 1
+    assert cache.stats()["hits"] == 1
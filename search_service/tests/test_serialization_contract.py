@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Optional
+
+import pytest
+
+from search_service.src import repository
+from search_service.src.schemas import PaginationMeta, SearchTaskView
+from search_service.src.serialization import render_snippet, task_json, task_page_json
+from search_service.src.statuses import SearchTaskStatus
+
+SPEC_PATH = Path(__file__).resolve().parents[1] / "api--v1.json"
+TEXTS = ("новости технологий", 'quoted "text" \\ slash', "line\nbreak\ttab\x01", "emoji 🚀 search", "plain query")
+
+
+class SearchTaskSearchView(SearchTaskView):
+    snippet: Optional[str] = None
+
+
+def _view_data(row: Any) -> dict[str, Any]:
+    task = repository.SearchTask.from_row(row)
+    return {
+        "task_id": task.id,
+        "telegram_id": task.telegram_id,
+        "text": task.text,
+        "status": task.status,
+        "priority": task.priority,
+        "short_summary": task.short_summary,
+        "summary": task.summary,
+        "error": task.error,
+        "created_at": task.created_at,
+        "updated_at": task.updated_at,
+    }
+
+
+def _pydantic_page(rows: list[Any], meta: dict[str, Any], *, snippets: bool = False) -> bytes:
+    if snippets:
+        data = [SearchTaskSearchView.model_validate({**_view_data(row), "snippet": render_snippet(row["snippet"])}) for row in rows]
+    else:
+        data = [SearchTaskView.model_validate(_view_data(row)) for row in rows]
+    meta_json = PaginationMeta.model_validate(meta).model_dump_json(by_alias=True)
+    data_json = ",".join(view.model_dump_json(by_alias=True) for view in data)
+    return f'{{"data":[{data_json}],"meta":{meta_json}}}'.encode("utf-8")
+
+
+def _check_schema(value: Any, schema: dict[str, Any], components: dict[str, Any], path: str) -> None:
+    if "$ref" in schema:
+        schema = components[schema["$ref"].rsplit("/", 1)[-1]]
+    if "allOf" in schema:
+        merged: dict[str, Any] = {"type": "object", "required": [], "properties": {}}
+        for part in schema["allOf"]:
+            part = components[part["$ref"].rsplit("/", 1)[-1]] if "$ref" in part else part
+            merged["required"] += part.get("required", [])
+            merged["properties"].update(part.get("properties", {}))
+        schema = merged
+    types = schema.get("type")
+    if value is None:
+        assert isinstance(types, list) and "null" in types, f"{path}: null not allowed"
+        return
+    if "enum" in schema:
+        assert value in schema["enum"], f"{path}: {value!r} not in enum"
+    base_type = [item for item in types if item != "null"][0] if isinstance(types, list) else types
+    if base_type == "object":
+        assert isinstance(value, dict), f"{path}: expected object"
+        for key in schema.get("required", ()):
+            assert key in value, f"{path}: missing {key}"
+        for key, item in value.items():
+            assert key in schema["properties"], f"{path}: unexpected {key}"
+            _check_schema(item, schema["properties"][key], components, f"{path}.{key}")
+    elif base_type == "array":
+        assert isinstance(value, list), f"{path}: expected array"
+        for index, item in enumerate(value):
+            _check_schema(item, schema["items"], components, f"{path}[{index}]")
+    elif base_type == "string":
+        assert isinstance(value, str), f"{path}: expected string"
+    elif base_type == "integer":
+        assert isinstance(value, int) and not isinstance(value, bool), f"{path}: expected integer"
+
+
+@pytest.fixture(scope="module")
+def components() -> dict[str, Any]:
+    return json.loads(SPEC_PATH.read_text(encoding="utf-8"))["components"]["schemas"]
+
+
+@pytest.fixture
+def tasks(db: Path) -> list[repository.SearchTask]:
+    created = repository.create_tasks([(str(index % 7), TEXTS[index % len(TEXTS)], index % 3) for index in range(40)])
+    for index, task in enumerate(created):
+        if index % 3 == 0:
+            repository.save_result(task.id, "short <b>", "summary " * 10 + TEXTS[index % len(TEXTS)], SearchTaskStatus.DONE)
+        elif index % 3 == 1:
+            repository.save_result(task.id, "failed", "", SearchTaskStatus.FAILED, error="boom\n")
+    return created
+
+
+@pytest.mark.parametrize("status", [None, *SearchTaskStatus])
+def test_page_matches_pydantic_and_spec(tasks: list[repository.SearchTask], components: dict[str, Any], status) -> None:
+    rows, meta = repository.list_task_rows(status, page=1, page_size=100)
+    body = task_page_json(rows, meta)
+    assert body == _pydantic_page(rows, meta)
+    assert json.loads(body)["meta"]["nextCursor"] is None
+    _check_schema(json.loads(body), {"$ref": "#/components/schemas/SearchTaskPage"}, components, "page")
+
+
+def test_cursor_pages_match_pydantic_and_spec(tasks: list[repository.SearchTask], components: dict[str, Any]) -> None:
+    cursor = None
+    seen = 0
+    while True:
+        rows, meta = repository.list_task_rows(None, page=1, page_size=15, cursor=cursor)
+        body = task_page_json(rows, meta)
+        assert body == _pydantic_page(rows, meta)
+        _check_schema(json.loads(body), {"$ref": "#/components/schemas/SearchTaskPage"}, components, "page")
+        seen += len(rows)
+        cursor = json.loads(body)["meta"]["nextCursor"]
+        if cursor is None:
+            break
+        assert isinstance(cursor, str)
+    assert seen == len(tasks)
+
+
+def test_search_page_with_snippets_matches_pydantic_and_spec(
+    tasks: list[repository.SearchTask],
+    components: dict[str, Any],
+) -> None:
+    rows, meta = repository.search_task_rows("summary", None, page=1, page_size=100)
+    assert rows
+    body = task_page_json(rows, meta, snippets=True)
+    assert body == _pydantic_page(rows, meta, snippets=True)
+    page = json.loads(body)
+    assert all("snippet" in item for item in page["data"])
+    _check_schema(page, {"$ref": "#/components/schemas/SearchTaskPage"}, components, "page")
+
+
+def test_task_json_matches_pydantic_and_spec(tasks: list[repository.SearchTask], components: dict[str, Any]) -> None:
+    for created in tasks:
+        task = repository.get_task(created.id)
+        body = task_json(task)
+        assert body == SearchTaskView.model_validate_json(body).model_dump_json(by_alias=True)
+        _check_schema(json.loads(body), {"$ref": "#/components/schemas/SearchTask"}, components, "task")
+
+
+def test_search_snippet_is_html_escaped(db: Path) -> None:
+    (task,) = repository.create_tasks([("1", "<img src=x onerror=alert(1)> & <script>payload</script>", 0)])
+    rows, meta = repository.search_task_rows("payload", None, page=1, page_size=10)
+    snippet = json.loads(task_page_json(rows, meta, snippets=True))["data"][0]["snippet"]
+    assert "<script>" not in snippet and "<img" not in snippet
+    assert "&lt;img src=x onerror=alert(1)&gt; &amp; &lt;script&gt;<mark>payload</mark>&lt;/script&gt;" == snippet
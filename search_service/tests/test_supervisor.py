@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import itertools
+from typing import Any
+
+import pytest
+
+from search_service.src import supervisor
+from search_service.src.config import settings
+
+
+class FakeProcess:
+    pids = itertools.count(1000)
+
+    def __init__(self, args: list[str], env: dict[str, str]) -> None:
+        self.pid = next(self.pids)
+        self.env = env
+        self.returncode: int | None = None
+
+    def poll(self) -> int | None:
+        return self.returncode
+
+    def send_signal(self, signum: int) -> None:
+        pass
+
+
+@pytest.fixture
+def pool(monkeypatch: pytest.MonkeyPatch) -> supervisor.Supervisor:
+    monkeypatch.setattr(supervisor.subprocess, "Popen", FakeProcess)
+    monkeypatch.setattr(settings, "metrics_port", 9100)
+    role = supervisor.Role("worker", lambda: "raw", lambda since: 0, lambda max_processes: {})
+    return supervisor.Supervisor(
+        role,
+        [],
+        min_processes=1,
+        max_processes=2,
+        scale_interval=1,
+        target_drain=1,
+        drain_timeout=1,
+    )
+
+
+def _ports(processes: list[Any]) -> list[str]:
+    return sorted(process.env["METRICS_PORT"] for process in processes)
+
+
+def test_scale_up_during_drain_does_not_reuse_retiring_slot(pool: supervisor.Supervisor) -> None:
+    pool.target = 2
+    pool._resize()
+    pool.target = 1
+    pool._resize()
+    assert [child.slot for child in pool._retiring] == [1]
+    pool.target = 2
+    pool._resize()
+    running = [child.process for child in pool._children.values()]
+    retiring = [child.process for child in pool._retiring]
+    assert not set(_ports(running)) & set(_ports(retiring))
+    assert _ports(running) == ["9100", "9102"]
+    retiring[0].returncode = 0
+    pool._reap()
+    assert not pool._retiring
+    pool.target = 1
+    pool._resize()
+    pool.target = 2
+    pool._resize()
+    assert sorted(pool._children) == [0, 1]
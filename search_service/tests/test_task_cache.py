@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import time
+from pathlib import Path
+
+from search_service.src import repository
+from search_service.src.serialization import task_json
+from search_service.src.statuses import SearchTaskStatus
+from search_service.src.task_cache import TaskViewCache
+
+
+def _cache(revalidate_after: float) -> TaskViewCache:
+    return TaskViewCache(
+        repository.get_task,
+        lambda task: task_json(task).encode("utf-8"),
+        terminal_ttl=3600,
+        active_ttl=3600,
+        max_entries=100,
+        updated_at=repository.get_task_updated_at,
+        revalidate_after=revalidate_after,
+    )
+
+
+def test_cache_picks_up_writes_from_other_processes(db: Path) -> None:
+    task = repository.create_task("1", "q")
+    cache = _cache(0.05)
+    before = cache.get(task.id)
+    assert cache.peek(task.id) is before
+    time.sleep(0.06)
+    assert cache.peek(task.id) is None
+    assert cache.get(task.id) is before
+    assert cache.stats()["revalidated"] == 1
+    repository.save_result(task.id, "short", "summary", SearchTaskStatus.DONE)
+    assert cache.peek(task.id) is before
+    time.sleep(0.06)
+    after = cache.get(task.id)
+    assert after.etag != before.etag
+    assert b'"status":"done"' in after.body
+
+
+def test_cache_without_revalidation_serves_until_ttl(db: Path) -> None:
+    task = repository.create_task("1", "q")
+    cache = _cache(0)
+    before = cache.get(task.id)
+    repository.save_result(task.id, "short", "summary", SearchTaskStatus.DONE)
+    time.sleep(0.01)
+    assert cache.get(task.id) is before
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import math
+import random
+
+import pytest
+
+from search_service.src.telegram import BLOCK_SEPARATOR, MESSAGE_LIMIT, _text_length, pack_messages, split_text
+
+
+def _squash(text: str) -> str:
+    return "".join(text.split())
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "😀" * 5000,
+        "a" + "😀" * 5000,
+        "😀 " * 5000,
+        "x" * 9000,
+        "слово " * 3000,
+        "Предложение номер один. " * 800,
+        "абзац\n\n" * 3000,
+    ],
+)
+def test_split_text_fills_chunks_up_to_the_limit(text: str) -> None:
+    chunks = split_text(text)
+    assert all(0 < _text_length(chunk) <= MESSAGE_LIMIT for chunk in chunks)
+    assert len(chunks) <= math.ceil(_text_length(text.strip()) / MESSAGE_LIMIT) + 1
+    assert _squash("".join(chunks)) == _squash(text)
+
+
+def test_split_text_random_mixed_width() -> None:
+    rng = random.Random(7)
+    words = ["слово", "word", "😀emoji", "🚀", "длинноеслово" * 3]
+    for _ in range(100):
+        text = ". ".join(" ".join(rng.choice(words) for _ in range(rng.randint(1, 30))) for _ in range(rng.randint(1, 300)))
+        chunks = split_text(text, 500)
+        assert all(0 < _text_length(chunk) <= 500 for chunk in chunks)
+        assert _squash("".join(chunks)) == _squash(text)
+
+
+def test_split_text_prefers_paragraph_and_sentence_boundaries() -> None:
+    assert split_text("aa bb. cc dd\n\nee", 9) == ["aa bb.", "cc dd\n\nee"]
+    assert split_text("first one. second", 12) == ["first one.", "second"]
+    assert split_text("short") == ["short"]
+
+
+def test_pack_messages_merges_blocks_and_reports_completed_counts() -> None:
+    messages = pack_messages(["a" * 2000, "b" * 2000, "c" * 5000, "d" * 10])
+    assert [completed for _, completed in messages] == [2, 2, 3, 4]
+    assert messages[0][0] == "a" * 2000 + BLOCK_SEPARATOR + "b" * 2000
+    assert all(_text_length(text) <= MESSAGE_LIMIT for text, _ in messages)